@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import APIRouter, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -5,7 +7,9 @@ from app.routes.admin import router as admin_router
 from app.routes.authentication import router as auth_router
 from app.routes.music import router as music_router
 from app.routes.webdav import router as webdav_router
+from app.routes.websub import router as websub_router
 from app.routes.youtube import router as youtube_router
+from app.services import httpclient, pubsub, redisclient, s3
 from app.settings import ENV, settings
 
 api_router = APIRouter(prefix="/api")
@@ -14,9 +18,25 @@ api_router.include_router(music_router)
 api_router.include_router(youtube_router)
 api_router.include_router(admin_router)
 api_router.include_router(webdav_router)
+api_router.include_router(websub_router)
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await pubsub.close_subscriber()
+    await pubsub.flush_publisher()
+    await httpclient.close_client()
+    await redisclient.close_connection_pool()
+    await s3.close_client()
 
-app = FastAPI(title="dripdrop", docs_url="/api/docs", openapi_url="/api/openapi.json")
+
+app = FastAPI(
+    title="dripdrop",
+    docs_url="/api/docs",
+    openapi_url="/api/openapi.json",
+    lifespan=lifespan,
+)
 app.include_router(api_router)
 
 
@@ -7,7 +7,12 @@ from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 from app.settings import settings
 
-engine = create_async_engine(settings.async_database_url)
+engine = create_async_engine(
+    settings.async_database_url,
+    pool_size=settings.database_pool_size,
+    max_overflow=settings.database_max_overflow,
+    pool_pre_ping=True,
+)
 session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
 
@@ -56,12 +56,17 @@ class MusicJob(Base):
     user: Mapped[User] = relationship(back_populates="jobs", uselist=True)
 
     async def cleanup(self):
-        if self.artwork_filename:
-            await s3.delete_file(filename=self.artwork_filename)
-        if self.download_filename:
-            await s3.delete_file(filename=self.download_filename)
-        if self.original_filename:
-            await s3.delete_file(filename=self.original_filename)
+        filenames = [
+            filename
+            for filename in [
+                self.artwork_filename,
+                self.download_filename,
+                self.original_filename,
+            ]
+            if filename
+        ]
+        if filenames:
+            await s3.delete_files(filenames=filenames)
 
     async def _upload_audio_file(self, music_file: MusicFile):
         filename = f"{settings.aws_s3_music_folder}/{self.id}/old/{music_file.filename}"
@@ -1,6 +1,7 @@
 from datetime import datetime
 
-from sqlalchemy import TIMESTAMP, ForeignKey
+from sqlalchemy import TIMESTAMP, ForeignKey, Index, delete, func, literal, select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db import Base
@@ -34,7 +35,10 @@ class YoutubeChannel(Base):
     last_videos_updated: Mapped[datetime] = mapped_column(
         TIMESTAMP(timezone=True), nullable=False
     )
-    updating: Mapped[bool] = mapped_column(nullable=False, default=False)
+    uploads_playlist_id: Mapped[str | None] = mapped_column(nullable=True)
+    websub_lease_expires: Mapped[datetime | None] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
     subscriptions: Mapped[list["YoutubeSubscription"]] = relationship(
         "YoutubeSubscription", back_populates="channel"
     )
@@ -76,20 +80,17 @@ class YoutubeSubscription(Base):
     )
 
 
-class YoutubeNewSubscription(Base):
-    __tablename__ = "youtube_new_subscriptions"
-
-    channel_id: Mapped[str] = mapped_column(primary_key=True)
-    email: Mapped[str] = mapped_column(
-        ForeignKey(
-            User.email,
-            onupdate="CASCADE",
-            ondelete="CASCADE",
-            name="youtube_new_subscriptions_email_fkey",
-        ),
-        nullable=False,
-        primary_key=True,
-    )
+Index(
+    "ix_youtube_subscriptions_email_active",
+    YoutubeSubscription.email,
+    YoutubeSubscription.channel_id,
+    postgresql_where=YoutubeSubscription.deleted_at.is_(None),
+)
+Index(
+    "ix_youtube_subscriptions_channel_id_active",
+    YoutubeSubscription.channel_id,
+    postgresql_where=YoutubeSubscription.deleted_at.is_(None),
+)
 
 
 class YoutubeVideoCategory(Base):
@@ -147,6 +148,18 @@ class YoutubeVideo(Base):
     )
 
 
+Index(
+    "ix_youtube_videos_channel_id_published_at",
+    YoutubeVideo.channel_id,
+    YoutubeVideo.published_at.desc(),
+)
+Index(
+    "ix_youtube_videos_category_id_published_at",
+    YoutubeVideo.category_id,
+    YoutubeVideo.published_at.desc(),
+)
+
+
 class YoutubeVideoLike(Base):
     __tablename__ = "youtube_video_likes"
 
@@ -174,6 +187,13 @@ class YoutubeVideoLike(Base):
     video: Mapped[YoutubeVideo] = relationship(YoutubeVideo, back_populates="likes")
 
 
+Index(
+    "ix_youtube_video_likes_email_created_at",
+    YoutubeVideoLike.email,
+    YoutubeVideoLike.created_at,
+)
+
+
 class YoutubeVideoQueue(Base):
     __tablename__ = "youtube_video_queues"
 
@@ -201,6 +221,13 @@ class YoutubeVideoQueue(Base):
     video: Mapped[YoutubeVideo] = relationship(YoutubeVideo, back_populates="queues")
 
 
+Index(
+    "ix_youtube_video_queues_email_created_at",
+    YoutubeVideoQueue.email,
+    YoutubeVideoQueue.created_at,
+)
+
+
 class YoutubeVideoWatch(Base):
     __tablename__ = "youtube_video_watches"
 
@@ -226,3 +253,106 @@ class YoutubeVideoWatch(Base):
     )
     user: Mapped[User] = relationship(User, back_populates="youtube_video_watches")
     video: Mapped[YoutubeVideo] = relationship(YoutubeVideo, back_populates="watches")
+
+
+Index(
+    "ix_youtube_video_watches_email_created_at",
+    YoutubeVideoWatch.email,
+    YoutubeVideoWatch.created_at,
+)
+
+
+class YoutubeUserFeed(Base):
+    __tablename__ = "youtube_user_feed"
+
+    email: Mapped[str] = mapped_column(
+        ForeignKey(
+            User.email,
+            onupdate="CASCADE",
+            ondelete="CASCADE",
+            name="youtube_user_feed_email_fkey",
+        ),
+        primary_key=True,
+        nullable=False,
+    )
+    video_id: Mapped[str] = mapped_column(
+        ForeignKey(
+            YoutubeVideo.id,
+            onupdate="CASCADE",
+            ondelete="CASCADE",
+            name="youtube_user_feed_video_id_fkey",
+        ),
+        primary_key=True,
+        nullable=False,
+    )
+    channel_id: Mapped[str] = mapped_column(
+        ForeignKey(
+            YoutubeChannel.id,
+            onupdate="CASCADE",
+            ondelete="CASCADE",
+            name="youtube_user_feed_channel_id_fkey",
+        ),
+        nullable=False,
+    )
+    published_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=False
+    )
+
+    @classmethod
+    def fan_out(cls, video_ids: list[str]):
+        query = insert(cls).from_select(
+            ["email", "video_id", "channel_id", "published_at", "created_at"],
+            select(
+                YoutubeSubscription.email,
+                YoutubeVideo.id,
+                YoutubeVideo.channel_id,
+                YoutubeVideo.published_at,
+                func.now(),
+            )
+            .join(
+                YoutubeSubscription,
+                YoutubeSubscription.channel_id == YoutubeVideo.channel_id,
+            )
+            .where(
+                YoutubeVideo.id.in_(video_ids),
+                YoutubeSubscription.deleted_at.is_(None),
+            ),
+        )
+        return query.on_conflict_do_update(
+            index_elements=[cls.email, cls.video_id],
+            set_={
+                "published_at": query.excluded.published_at,
+                "modified_at": func.now(),
+            },
+        )
+
+    @classmethod
+    def backfill(cls, email: str, channel_ids: list[str]):
+        query = insert(cls).from_select(
+            ["email", "video_id", "channel_id", "published_at", "created_at"],
+            select(
+                literal(email),
+                YoutubeVideo.id,
+                YoutubeVideo.channel_id,
+                YoutubeVideo.published_at,
+                func.now(),
+            ).where(YoutubeVideo.channel_id.in_(channel_ids)),
+        )
+        return query.on_conflict_do_nothing()
+
+    @classmethod
+    def prune(cls, email: str, channel_ids: list[str]):
+        return delete(cls).where(cls.email == email, cls.channel_id.in_(channel_ids))
+
+
+Index(
+    "ix_youtube_user_feed_email_published_at",
+    YoutubeUserFeed.email,
+    YoutubeUserFeed.published_at.desc(),
+    YoutubeUserFeed.video_id.desc(),
+)
+Index(
+    "ix_youtube_user_feed_email_channel_id",
+    YoutubeUserFeed.email,
+    YoutubeUserFeed.channel_id,
+)
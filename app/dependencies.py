@@ -6,8 +6,8 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import User, session_maker
+from app.services import redisclient
 from app.services.jwt import decode_jwt
-from app.settings import settings
 
 
 async def provide_session():
@@ -19,12 +19,8 @@ DatabaseSession = Annotated[AsyncSession, Depends(provide_session)]
 
 
 async def provide_redis():
-    redis = Redis.from_url(settings.redis_url)
-    try:
+    async with redisclient.RedisClient() as redis:
         yield redis
-    except Exception as e:
-        await redis.aclose()
-        raise e
 
 
 RedisClient = Annotated[Redis, Depends(provide_redis)]
@@ -12,3 +12,9 @@ class Response(BaseModel):
 class Pagination(BaseModel):
     page: int = Field(..., ge=1)
     per_page: int = Field(..., le=50, gt=0)
+
+
+class EventsCursor(BaseModel):
+    cursor: str | None = Field(None, pattern=r"^\d+-\d+$")
+    consumer: str | None = Field(None, max_length=64)
+    limit: int = Field(100, le=1000, gt=0)
@@ -0,0 +1,23 @@
+from datetime import date
+
+from app.models import Response
+
+
+class HttpClientPoolStatsResponse(Response):
+    host: str
+    max_connections: int
+    connections: int
+    idle_connections: int
+    http2_connections: int
+
+
+class HttpClientStatsResponse(Response):
+    pools: list[HttpClientPoolStatsResponse]
+
+
+class YoutubeQuotaResponse(Response):
+    date: date
+    limit: int
+    used: int
+    remaining: int
+    endpoints: dict[str, int]
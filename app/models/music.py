@@ -20,6 +20,17 @@ class MusicJobUpdateResponse(Response):
     status: Literal["STARTED", "COMPLETED"]
 
 
+class MusicJobEventResponse(Response):
+    id: str
+    update: MusicJobUpdateResponse
+
+
+class MusicJobEventsResponse(Response):
+    events: list[MusicJobEventResponse]
+    cursor: str
+    reset: bool
+
+
 class TagsResponse(Response):
     title: Optional[str] = None
     artist: Optional[str] = None
@@ -40,6 +51,25 @@ class CreateMusicJob(BaseModel):
     grouping: Optional[str] = None
 
 
+class CreateMusicJobUpload(BaseModel):
+    filename: str
+    content_type: str
+
+
+class MusicJobUploadResponse(Response):
+    job_id: str
+    url: str
+    fields: dict[str, str]
+
+
+class ConfirmMusicJobUpload(BaseModel):
+    artwork_url: Optional[str] = None
+    title: str
+    artist: str
+    album: str
+    grouping: Optional[str] = None
+
+
 class MusicJobResponse(Response):
     model_config = ConfigDict(from_attributes=True)
 
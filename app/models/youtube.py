@@ -11,6 +11,17 @@ class YoutubeChannelUpdateResponse(Response):
     updating: bool
 
 
+class YoutubeChannelEventResponse(Response):
+    id: str
+    update: YoutubeChannelUpdateResponse
+
+
+class YoutubeChannelEventsResponse(Response):
+    events: list[YoutubeChannelEventResponse]
+    cursor: str
+    reset: bool
+
+
 class YoutubeChannelResponse(Response):
     model_config = ConfigDict(from_attributes=True)
 
@@ -56,7 +67,9 @@ class YoutubeVideoResponse(Response):
 
 class YoutubeVideosResponse(Response):
     videos: list[YoutubeVideoResponse]
-    total_pages: int
+    total_pages: int | None = None
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
 
 
 class YoutubeVideoDetailResponse(YoutubeVideoResponse):
@@ -68,6 +81,8 @@ class YoutubeVideoCategoriesResponse(Response):
 
 
 class GetVideos(Pagination):
+    page: Optional[int] = Field(None, ge=1)
+    cursor: Optional[str] = Field(None)
     video_categories: Optional[list[int]] = Field([])
     channel_id: Optional[str] = Field(None)
     liked_only: Optional[bool] = Field(False)
@@ -4,6 +4,8 @@ from fastapi import APIRouter, BackgroundTasks, Depends, Query, Response, status
 from pydantic import EmailStr
 
 from app.dependencies import get_admin_user
+from app.models.admin import HttpClientStatsResponse, YoutubeQuotaResponse
+from app.services import httpclient, quota
 from app.tasks import youtube
 
 router = APIRouter(
@@ -58,3 +60,16 @@ async def run_update_channel_videos(
 async def run_update_video_categories(background_tasks: BackgroundTasks):
     background_tasks.add_task(youtube.update_video_categories.delay)
     return Response(None, status_code=status.HTTP_200_OK)
+
+
+@router.get("/youtube/quota", response_model=YoutubeQuotaResponse)
+async def get_youtube_quota():
+    usage = await quota.get_usage()
+    return YoutubeQuotaResponse(**usage.__dict__)
+
+
+@router.get("/httpclient/stats", response_model=HttpClientStatsResponse)
+async def get_httpclient_stats():
+    return HttpClientStatsResponse(
+        pools=[stats.__dict__ for stats in httpclient.get_pool_stats()]
+    )
@@ -1,12 +1,16 @@
+import json
 import re
+import uuid
 from datetime import datetime, timezone
 from typing import Annotated
 
 from fastapi import (
     APIRouter,
     BackgroundTasks,
+    Body,
     Depends,
     Form,
+    Header,
     HTTPException,
     Path,
     Query,
@@ -14,17 +18,31 @@ from fastapi import (
     WebSocketDisconnect,
     status,
 )
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select
+from yt_dlp.utils import sanitize_filename
 
 from app.db import MusicFile, MusicJob
-from app.dependencies import AuthUser, DatabaseSession, get_authenticated_user
-from app.models import Pagination
+from app.dependencies import (
+    AuthUser,
+    DatabaseSession,
+    RedisClient,
+    get_authenticated_user,
+)
+from app.models import EventsCursor, Pagination
 from app.models.music import (
+    ConfirmMusicJobUpload,
     CreateMusicJob,
+    CreateMusicJobUpload,
+    MusicJobEventResponse,
+    MusicJobEventsResponse,
     MusicJobListResponse,
     MusicJobUpdateResponse,
+    MusicJobUploadResponse,
 )
+from app.services import pubsub, s3, sse
 from app.services.pubsub import PubSub
+from app.settings import settings
 from app.tasks.music import run_music_job
 from app.utils.database import query_with_pagination
 
@@ -34,6 +52,8 @@ router = APIRouter(
     dependencies=[Depends(get_authenticated_user)],
 )
 
+PENDING_UPLOAD_KEY = "music:upload:{job_id}"
+
 
 @router.post("/create", status_code=status.HTTP_201_CREATED)
 async def create_job(
@@ -82,6 +102,100 @@ async def create_job(
     return None
 
 
+@router.post(
+    "/upload",
+    response_model=MusicJobUploadResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_job_upload(
+    user: AuthUser,
+    redis: RedisClient,
+    body: Annotated[CreateMusicJobUpload, Body()],
+):
+    if not re.match("^audio/", body.content_type):
+        raise HTTPException(
+            detail="File is incorrect format.",
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+        )
+    job_id = str(uuid.uuid4())
+    filename = "{folder}/{job_id}/old/{filename}".format(
+        folder=settings.aws_s3_music_folder,
+        job_id=job_id,
+        filename=sanitize_filename(body.filename),
+    )
+    presigned_post = await s3.generate_presigned_post(
+        filename=filename,
+        content_type=body.content_type,
+        max_size=settings.music_upload_max_size,
+        expires_in=settings.music_upload_expiry,
+    )
+    # The job is only created once the upload is confirmed, so remember who it
+    # was presigned for until then.
+    await redis.set(
+        PENDING_UPLOAD_KEY.format(job_id=job_id),
+        json.dumps({"email": user.email, "filename": filename}),
+        ex=settings.music_upload_expiry * 2,
+    )
+    return MusicJobUploadResponse(
+        job_id=job_id, url=presigned_post["url"], fields=presigned_post["fields"]
+    )
+
+
+@router.post(
+    "/{job_id}/confirm",
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"description": "File has not been uploaded."},
+        status.HTTP_404_NOT_FOUND: {"description": "Upload not found."},
+        status.HTTP_409_CONFLICT: {"description": "Upload already confirmed."},
+    },
+)
+async def confirm_job_upload(
+    user: AuthUser,
+    db_session: DatabaseSession,
+    redis: RedisClient,
+    background_tasks: BackgroundTasks,
+    job_id: Annotated[str, Path()],
+    body: Annotated[ConfirmMusicJobUpload, Body()],
+):
+    pending_upload_key = PENDING_UPLOAD_KEY.format(job_id=job_id)
+    pending_upload = await redis.get(pending_upload_key)
+    if pending_upload:
+        pending_upload = json.loads(pending_upload)
+    if not pending_upload or pending_upload["email"] != user.email:
+        raise HTTPException(
+            detail="Upload not found.", status_code=status.HTTP_404_NOT_FOUND
+        )
+    filename = pending_upload["filename"]
+    if not await s3.head_file(filename=filename):
+        raise HTTPException(
+            detail="File has not been uploaded.",
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
+    # Only one of several concurrent confirms gets to delete the pending upload.
+    # The others would otherwise all try to insert the same job.
+    if not await redis.delete(pending_upload_key):
+        raise HTTPException(
+            detail="Upload already confirmed.", status_code=status.HTTP_409_CONFLICT
+        )
+    music_job = MusicJob(
+        id=job_id,
+        user_email=user.email,
+        title=body.title,
+        artist=body.artist,
+        album=body.album,
+        grouping=body.grouping,
+        original_filename=filename,
+        filename_url=s3.resolve_url(filename=filename),
+    )
+    db_session.add(music_job)
+    await db_session.commit()
+    if body.artwork_url:
+        background_tasks.add_task(music_job.upload_files, artwork_url=body.artwork_url)
+    background_tasks.add_task(run_music_job.delay, music_job_id=str(music_job.id))
+    return None
+
+
 @router.delete(
     "/{job_id}/delete",
     responses={status.HTTP_404_NOT_FOUND: {"description": "Job not found."}},
@@ -126,26 +240,67 @@ async def get_jobs(
 
 
 @router.websocket("/listen")
-async def listen_jobs(
-    user: AuthUser, websocket: WebSocket, db_session: DatabaseSession
-):
+async def listen_jobs(user: AuthUser, websocket: WebSocket):
     await websocket.accept()
-    subscriber = PubSub(channels=[PubSub.Channels.MUSIC_JOB_UPDATE])
+    subscriber = PubSub(
+        channels=[
+            PubSub.Channels.for_user(PubSub.Channels.MUSIC_JOB_UPDATE, email=user.email)
+        ]
+    )
     try:
-        async for message in subscriber.listen(ignore_subscribe_messages=True):
+        async for message in subscriber.listen():
             if message:
                 parsed_message = MusicJobUpdateResponse.model_validate_json(
                     message["data"]
                 )
-                job_id = parsed_message.id
-                query = select(MusicJob).where(
-                    MusicJob.user_email == user.email,
-                    MusicJob.id == job_id,
-                    MusicJob.deleted_at.is_(None),
-                )
-                music_job = await db_session.scalar(query)
-                if music_job:
-                    await websocket.send_json(parsed_message.model_dump())
-            await websocket.send_json({"status": "PING"})
+                await websocket.send_json(parsed_message.model_dump())
+            else:
+                await websocket.send_json({"status": "PING"})
     except WebSocketDisconnect:
         subscriber.stop_listening()
+
+
+@router.get("/events")
+async def job_events(
+    user: AuthUser,
+    db_session: DatabaseSession,
+    last_event_id: Annotated[str | None, Header()] = None,
+):
+    # The response can stay open for hours, don't hold a database connection
+    # for it.
+    await db_session.close()
+    return StreamingResponse(
+        sse.event_stream(
+            channel=PubSub.Channels.for_user(
+                PubSub.Channels.MUSIC_JOB_UPDATE, email=user.email
+            ),
+            last_event_id=last_event_id,
+        ),
+        media_type="text/event-stream",
+        headers=sse.HEADERS,
+    )
+
+
+@router.get("/events/since", response_model=MusicJobEventsResponse)
+async def get_job_events(
+    user: AuthUser,
+    query_params: Annotated[EventsCursor, Query()],
+):
+    events, cursor, reset = await pubsub.get_events_since(
+        channel=PubSub.Channels.for_user(
+            PubSub.Channels.MUSIC_JOB_UPDATE, email=user.email
+        ),
+        cursor=query_params.cursor,
+        consumer=query_params.consumer,
+        count=query_params.limit,
+    )
+    return MusicJobEventsResponse(
+        events=[
+            MusicJobEventResponse(
+                id=id, update=MusicJobUpdateResponse.model_validate_json(data)
+            )
+            for id, data in events
+        ],
+        cursor=cursor,
+        reset=reset,
+    )
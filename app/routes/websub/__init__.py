@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta, timezone
+from typing import Annotated
+from xml.etree.ElementTree import ParseError
+
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import PlainTextResponse
+
+from app.db import YoutubeChannel
+from app.dependencies import DatabaseSession
+from app.services import websub
+from app.settings import settings
+from app.tasks.youtube import add_channel_video
+
+# Hubs cannot authenticate as a user, so requests are checked against the
+# topic and the per channel secret instead.
+router = APIRouter(prefix="/websub", tags=["WebSub"])
+
+
+@router.get(
+    "/youtube",
+    response_class=PlainTextResponse,
+    responses={status.HTTP_404_NOT_FOUND: {"description": "Channel not found."}},
+)
+async def verify_youtube_subscription(
+    db_session: DatabaseSession,
+    channel_id: Annotated[str, Query()],
+    mode: Annotated[str, Query(alias="hub.mode")],
+    topic: Annotated[str, Query(alias="hub.topic")],
+    challenge: Annotated[str, Query(alias="hub.challenge")],
+    lease_seconds: Annotated[int | None, Query(alias="hub.lease_seconds")] = None,
+):
+    channel = await db_session.get(YoutubeChannel, channel_id)
+    if not channel or topic != websub.get_topic_url(channel_id):
+        raise HTTPException(
+            detail="Channel not found.", status_code=status.HTTP_404_NOT_FOUND
+        )
+    if mode == "subscribe":
+        channel.websub_lease_expires = datetime.now(timezone.utc) + timedelta(
+            seconds=lease_seconds or settings.websub_lease_seconds
+        )
+    elif mode == "unsubscribe":
+        channel.websub_lease_expires = None
+    else:
+        raise HTTPException(
+            detail="Invalid mode.", status_code=status.HTTP_400_BAD_REQUEST
+        )
+    await db_session.commit()
+    return PlainTextResponse(challenge)
+
+
+@router.post("/youtube", responses={status.HTTP_400_BAD_REQUEST: {}})
+async def receive_youtube_notification(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    channel_id: Annotated[str, Query()],
+    x_hub_signature: Annotated[str | None, Header()] = None,
+):
+    body = await request.body()
+    # Unsigned or forged notifications are acknowledged but ignored so the
+    # hub does not keep retrying them.
+    if not websub.verify_signature(
+        channel_id=channel_id, body=body, signature=x_hub_signature
+    ):
+        return Response(None, status_code=status.HTTP_202_ACCEPTED)
+    try:
+        entries = websub.parse_feed(body)
+    except ParseError:
+        raise HTTPException(
+            detail="Invalid feed.", status_code=status.HTTP_400_BAD_REQUEST
+        )
+    for entry in entries:
+        if entry.channel_id != channel_id:
+            continue
+        background_tasks.add_task(
+            add_channel_video.delay,
+            channel_id=entry.channel_id,
+            video_id=entry.video_id,
+        )
+    return Response(None, status_code=status.HTTP_202_ACCEPTED)
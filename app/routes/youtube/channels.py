@@ -6,23 +6,29 @@ from fastapi import (
     BackgroundTasks,
     Body,
     Depends,
+    Header,
     HTTPException,
     Path,
+    Query,
     WebSocket,
     WebSocketDisconnect,
     status,
 )
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.orm import joinedload
 
 from app.db import YoutubeChannel, YoutubeSubscription, YoutubeUserChannel
 from app.dependencies import AuthUser, DatabaseSession, get_authenticated_user
+from app.models import EventsCursor
 from app.models.youtube import (
+    YoutubeChannelEventResponse,
+    YoutubeChannelEventsResponse,
     YoutubeChannelResponse,
     YoutubeChannelUpdateResponse,
     YoutubeUserChannelResponse,
 )
-from app.services import google
+from app.services import google, pubsub, sse
 from app.services.pubsub import PubSub
 from app.tasks import youtube
 
@@ -34,27 +40,72 @@ router = APIRouter(
 
 
 @router.websocket("/listen")
-async def listen_channels(
-    user: AuthUser, websocket: WebSocket, db_session: DatabaseSession
-):
+async def listen_channels(user: AuthUser, websocket: WebSocket):
     await websocket.accept()
-    subscriber = PubSub(channels=[PubSub.Channels.YOUTUBE_CHANNEL_UPDATE])
+    subscriber = PubSub(
+        channels=[
+            PubSub.Channels.for_user(
+                PubSub.Channels.YOUTUBE_CHANNEL_UPDATE, email=user.email
+            )
+        ]
+    )
     try:
-        async for message in subscriber.listen(ignore_subscribe_messages=True):
+        async for message in subscriber.listen():
             if message:
                 parsed_message = YoutubeChannelUpdateResponse.model_validate_json(
                     message["data"]
                 )
-                channel_id = parsed_message.id
-                query = select(YoutubeSubscription).where(
-                    YoutubeSubscription.channel_id == channel_id,
-                    YoutubeSubscription.email == user.email,
-                )
-                if await db_session.scalar(query):
-                    await websocket.send_json(parsed_message)
-            await websocket.send_json({"status": "PING"})
+                await websocket.send_json(parsed_message.model_dump())
+            else:
+                await websocket.send_json({"status": "PING"})
     except WebSocketDisconnect:
-        await subscriber.stop_listening()
+        subscriber.stop_listening()
+
+
+@router.get("/events")
+async def channel_events(
+    user: AuthUser,
+    db_session: DatabaseSession,
+    last_event_id: Annotated[str | None, Header()] = None,
+):
+    # The response can stay open for hours, don't hold a database connection
+    # for it.
+    await db_session.close()
+    return StreamingResponse(
+        sse.event_stream(
+            channel=PubSub.Channels.for_user(
+                PubSub.Channels.YOUTUBE_CHANNEL_UPDATE, email=user.email
+            ),
+            last_event_id=last_event_id,
+        ),
+        media_type="text/event-stream",
+        headers=sse.HEADERS,
+    )
+
+
+@router.get("/events/since", response_model=YoutubeChannelEventsResponse)
+async def get_channel_events(
+    user: AuthUser,
+    query_params: Annotated[EventsCursor, Query()],
+):
+    events, cursor, reset = await pubsub.get_events_since(
+        channel=PubSub.Channels.for_user(
+            PubSub.Channels.YOUTUBE_CHANNEL_UPDATE, email=user.email
+        ),
+        cursor=query_params.cursor,
+        consumer=query_params.consumer,
+        count=query_params.limit,
+    )
+    return YoutubeChannelEventsResponse(
+        events=[
+            YoutubeChannelEventResponse(
+                id=id, update=YoutubeChannelUpdateResponse.model_validate_json(data)
+            )
+            for id, data in events
+        ],
+        cursor=cursor,
+        reset=reset,
+    )
 
 
 @router.get(
@@ -134,7 +185,7 @@ async def get_youtube_channel(
             subscribed=bool(
                 channel.subscriptions[0] if channel.subscriptions else False
             ),
-            updating=channel.updating,
+            updating=bool(await youtube.get_updating_channel_ids([channel.id])),
         )
     raise HTTPException(
         detail="Youtube Channel not found.", status_code=status.HTTP_404_NOT_FOUND
@@ -12,12 +12,12 @@ from fastapi import (
 from sqlalchemy import select
 from sqlalchemy.orm import joinedload
 
-from app.db import YoutubeChannel, YoutubeSubscription
+from app.db import YoutubeChannel, YoutubeSubscription, YoutubeUserFeed
 from app.dependencies import AuthUser, DatabaseSession, get_authenticated_user
 from app.models import Pagination
 from app.models.youtube import YoutubeChannelResponse, YoutubeSubscriptionsResponse
 from app.services import google
-from app.tasks.youtube import add_channel_videos
+from app.tasks.youtube import add_channel_videos, get_updating_channel_ids
 from app.utils.database import query_with_pagination
 
 router = APIRouter(
@@ -49,10 +49,19 @@ async def get_youtube_subscriptions(
         page=query_params.page,
         per_page=query_params.per_page,
     )
+    # The results can only be iterated once.
+    subscriptions = paginated_results.results.all()
+    updating_channel_ids = await get_updating_channel_ids(
+        [subscription.channel_id for subscription in subscriptions]
+    )
     return YoutubeSubscriptionsResponse(
         channels=[
-            {"subscribed": True, **result.channel.__dict__}
-            for result in paginated_results.results
+            {
+                "subscribed": True,
+                "updating": subscription.channel_id in updating_channel_ids,
+                **subscription.channel.__dict__,
+            }
+            for subscription in subscriptions
         ],
         total_pages=paginated_results.total_pages,
     )
@@ -81,7 +90,11 @@ async def add_user_subscription(
         if subscription := await db_session.scalar(query):
             if subscription.deleted_at is None:
                 return YoutubeChannelResponse(
-                    subscribed=True, **subscription.channel.__dict__
+                    subscribed=True,
+                    updating=bool(
+                        await get_updating_channel_ids([subscription.channel_id])
+                    ),
+                    **subscription.channel.__dict__,
                 )
             subscription.deleted_at = None
             channel = subscription.channel
@@ -102,9 +115,16 @@ async def add_user_subscription(
                 user_submitted=True,
             )
             db_session.add(subscription)
+        await db_session.execute(
+            YoutubeUserFeed.backfill(email=user.email, channel_ids=[channel.id])
+        )
         await db_session.commit()
         background_tasks.add_task(add_channel_videos.delay, channel_id=channel.id)
-        return YoutubeChannelResponse(subscribed=True, **subscription.channel.__dict__)
+        return YoutubeChannelResponse(
+            subscribed=True,
+            updating=bool(await get_updating_channel_ids([channel.id])),
+            **subscription.channel.__dict__,
+        )
     raise HTTPException(
         detail="Channel not found.",
         status_code=status.HTTP_400_BAD_REQUEST,
@@ -124,6 +144,9 @@ async def delete_user_subscription(
     )
     if subscription := await db_session.scalar(query):
         subscription.deleted_at = datetime.now(timezone.utc)
+        await db_session.execute(
+            YoutubeUserFeed.prune(email=user.email, channel_ids=[channel_id])
+        )
         await db_session.commit()
         return None
     raise HTTPException(
@@ -5,8 +5,7 @@ from sqlalchemy import select
 from sqlalchemy.orm import joinedload, selectinload
 
 from app.db import (
-    YoutubeChannel,
-    YoutubeSubscription,
+    YoutubeUserFeed,
     YoutubeVideo,
     YoutubeVideoCategory,
     YoutubeVideoLike,
@@ -21,7 +20,7 @@ from app.models.youtube import (
     YoutubeVideoResponse,
     YoutubeVideosResponse,
 )
-from app.utils.database import query_with_pagination
+from app.utils.database import query_with_cursor, query_with_pagination
 
 router = APIRouter(
     prefix="/videos",
@@ -41,44 +40,51 @@ async def get_youtube_video_categories(db_session: DatabaseSession):
     return YoutubeVideoCategoriesResponse(categories=categories)
 
 
-@router.get("/list", response_model=YoutubeVideosResponse)
+@router.get(
+    "/list",
+    response_model=YoutubeVideosResponse,
+    responses={status.HTTP_400_BAD_REQUEST: {"description": "Invalid cursor."}},
+)
 async def get_youtube_videos(
     user: AuthUser,
     db_session: DatabaseSession,
     query_params: Annotated[GetVideos, Query()],
 ):
     query = select(YoutubeVideo)
+    order_by = [
+        YoutubeVideo.published_at.desc(),
+        YoutubeVideo.title.desc(),
+        YoutubeVideo.id.desc(),
+    ]
     if query_params.channel_id:
         query = query.where(YoutubeVideo.channel_id == query_params.channel_id)
-    else:
-        if not query_params.queued_only and not query_params.liked_only:
-            query = query.where(
-                YoutubeVideo.channel_id.in_(
-                    select(YoutubeChannel.id)
-                    .join(YoutubeSubscription)
-                    .where(
-                        YoutubeSubscription.email == user.email,
-                        YoutubeSubscription.deleted_at.is_(None),
-                    )
-                )
-            )
+    elif not query_params.queued_only and not query_params.liked_only:
+        query = query.join(
+            YoutubeUserFeed, YoutubeUserFeed.video_id == YoutubeVideo.id
+        ).where(YoutubeUserFeed.email == user.email)
+        order_by = [
+            YoutubeUserFeed.published_at.desc(),
+            YoutubeVideo.title.desc(),
+            YoutubeUserFeed.video_id.desc(),
+        ]
     if query_params.video_categories:
         query = query.where(YoutubeVideo.category_id.in_(query_params.video_categories))
     if query_params.liked_only:
-        query = (
-            query.join(YoutubeVideoLike)
-            .where(YoutubeVideoLike.email == user.email)
-            .order_by(YoutubeVideoLike.created_at.desc())
-        )
+        query = query.join(YoutubeVideoLike).where(YoutubeVideoLike.email == user.email)
+        order_by = [
+            YoutubeVideoLike.created_at.desc(),
+            YoutubeVideo.title.desc(),
+            YoutubeVideo.id.desc(),
+        ]
     elif query_params.queued_only:
-        query = (
-            query.join(YoutubeVideoQueue)
-            .where(YoutubeVideoQueue.email == user.email)
-            .order_by(YoutubeVideoQueue.created_at.asc())
+        query = query.join(YoutubeVideoQueue).where(
+            YoutubeVideoQueue.email == user.email
         )
-    else:
-        query = query.order_by(YoutubeVideo.published_at.desc())
-    query = query.order_by(YoutubeVideo.title.desc())
+        order_by = [
+            YoutubeVideoQueue.created_at.asc(),
+            YoutubeVideo.title.desc(),
+            YoutubeVideo.id.desc(),
+        ]
     query = query.options(
         joinedload(YoutubeVideo.channel),
         joinedload(YoutubeVideo.category),
@@ -86,14 +92,35 @@ async def get_youtube_videos(
         selectinload(YoutubeVideo.queues.and_(YoutubeVideoQueue.email == user.email)),
         selectinload(YoutubeVideo.watches.and_(YoutubeVideoWatch.email == user.email)),
     )
-    paginated_results = await query_with_pagination(
-        db_session=db_session,
-        query=query,
-        page=query_params.page,
-        per_page=query_params.per_page,
-    )
+    if query_params.page:
+        paginated_results = await query_with_pagination(
+            db_session=db_session,
+            query=query.order_by(*order_by),
+            page=query_params.page,
+            per_page=query_params.per_page,
+        )
+        results = paginated_results.results
+        total_pages = paginated_results.total_pages
+        next_cursor = prev_cursor = None
+    else:
+        try:
+            cursor_results = await query_with_cursor(
+                db_session=db_session,
+                query=query,
+                order_by=order_by,
+                per_page=query_params.per_page,
+                cursor=query_params.cursor,
+            )
+        except ValueError:
+            raise HTTPException(
+                detail="Invalid cursor.", status_code=status.HTTP_400_BAD_REQUEST
+            )
+        results = cursor_results.results
+        total_pages = None
+        next_cursor = cursor_results.next_cursor
+        prev_cursor = cursor_results.prev_cursor
     videos = []
-    for result in paginated_results.results:
+    for result in results:
         watched = result.watches[0].created_at if result.watches else None
         liked = result.likes[0].created_at if result.likes else None
         queued = result.queues[0].created_at if result.queues else None
@@ -103,7 +130,10 @@ async def get_youtube_videos(
         video_result.queued = queued
         videos.append(video_result)
     return YoutubeVideosResponse(
-        videos=videos, total_pages=paginated_results.total_pages
+        videos=videos,
+        total_pages=total_pages,
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
     )
 
 
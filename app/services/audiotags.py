@@ -18,6 +18,11 @@ logger = logging.getLogger(__name__)
 
 BASE64_IMAGE_TYPES = {"/9j": "image/jpg", "iVBORw0KGgo": "image/png"}
 
+# Space reserved after the tag whenever it outgrows its padding, so that later
+# edits (a new cover, a longer title) are written in place instead of shifting
+# the whole audio payload.
+TAG_PADDING = 256 * 1024
+
 
 @dataclass
 class Tags:
@@ -29,6 +34,11 @@ class Tags:
 
 
 class AudioTags:
+    """
+    Setters only stage changes on the in memory tag, nothing is written until
+    commit() saves them all at once.
+    """
+
     _TITLE_TAG = "TIT2"
     _ARTIST_TAG = "TPE1"
     _ALBUM_TAG = "TALB"
@@ -37,6 +47,7 @@ class AudioTags:
 
     def __init__(self, file_path: str):
         self.tags = mutagen.id3.ID3(file_path)
+        self.changed = False
 
     def _get_tag(self, tag_name: str = ...) -> str | None:
         tag = self.tags.get(tag_name)
@@ -52,7 +63,7 @@ class AudioTags:
     def title(self, value: str):
         self.tags.delall(AudioTags._TITLE_TAG)
         self.tags.add(mutagen.id3.TIT2(text=[value]))
-        self.tags.save()
+        self.changed = True
 
     @property
     def artist(self):
@@ -62,7 +73,7 @@ class AudioTags:
     def artist(self, value: str):
         self.tags.delall(AudioTags._ARTIST_TAG)
         self.tags.add(mutagen.id3.TPE1(text=value))
-        self.tags.save()
+        self.changed = True
 
     @property
     def album(self):
@@ -72,7 +83,7 @@ class AudioTags:
     def album(self, value: str):
         self.tags.delall(AudioTags._ALBUM_TAG)
         self.tags.add(mutagen.id3.TALB(text=value))
-        self.tags.save()
+        self.changed = True
 
     @property
     def grouping(self):
@@ -82,7 +93,7 @@ class AudioTags:
     def grouping(self, value: str):
         self.tags.delall(AudioTags._GROUPING_TAG)
         self.tags.add(mutagen.id3.TIT1(text=value))
-        self.tags.save()
+        self.changed = True
 
     @property
     def artwork(self):
@@ -94,7 +105,21 @@ class AudioTags:
     def set_artwork(self, data: bytes, mime_type: str):
         self.tags.delall(AudioTags._ARTWORK_TAG)
         self.tags.add(mutagen.id3.APIC(mime=mime_type, data=data))
-        self.tags.save()
+        self.changed = True
+
+    @staticmethod
+    def _padding(info: mutagen.PaddingInfo):
+        # Keep whatever padding is left rather than letting mutagen trim it,
+        # trimming would move the audio just as growing does.
+        if info.padding >= 0:
+            return info.padding
+        return max(TAG_PADDING, info.get_default_padding())
+
+    def commit(self):
+        if not self.changed:
+            return
+        self.tags.save(padding=AudioTags._padding)
+        self.changed = False
 
     @classmethod
     def get_base64_mime_type(cls, base64_string: str):
@@ -1,24 +1,106 @@
 import asyncio
+from collections.abc import AsyncIterable
 from pathlib import Path
 
+from app.settings import settings
+
+# Containers whose index can sit at the end of the file. ffmpeg has to seek to
+# read them, which it can't do on a pipe.
+UNSEEKABLE_SUFFIXES = {".3gp", ".m4a", ".m4b", ".mov", ".mp4"}
+
+# Cover art codecs the mp3 muxer accepts as is, anything else is re-encoded.
+ARTWORK_COPY_EXTENSIONS = {"jpeg", "jpg", "png"}
+
+OUTPUT_CHUNK_SIZE = 1024 * 1024
+
+
+def can_convert_stream(filename: str):
+    return Path(filename).suffix.lower() not in UNSEEKABLE_SUFFIXES
+
+
+async def transcode_to_mp3(
+    source: str | Path | AsyncIterable[bytes],
+    metadata: dict[str, str],
+    artwork_file: str | Path | None = None,
+    copy_audio: bool = False,
+):
+    """
+    Encode the source to a tagged mp3 in a single ffmpeg run and yield the
+    result as it is produced. A file path is read by ffmpeg directly, an async
+    iterator of bytes is written to its stdin while the output is read, so
+    neither the input nor the output has to touch the disk. Metadata keys are
+    ffmpeg tag names (title, artist, album, grouping), which the mp3 muxer
+    writes as their ID3v2 frames, and the artwork is muxed in as the front
+    cover.
+
+    The Xing/LAME header is left out. ffmpeg fills it in by seeking back once
+    encoding finishes, which it can't do on a pipe, and a header left at its
+    placeholder values reports a wrong duration. Without it players estimate
+    the duration from the bitrate, exact for the constant bitrate encode but
+    approximate for copied variable bitrate sources, and gapless playback
+    info is lost.
+    """
+
+    piped = not isinstance(source, (str, Path))
+    args = ["-i", "pipe:0" if piped else str(source)]
+    if artwork_file:
+        args += ["-i", str(artwork_file), "-map", "0:a", "-map", "1:v"]
+        artwork_extension = Path(artwork_file).suffix.lstrip(".").lower()
+        args += [
+            "-c:v",
+            "copy" if artwork_extension in ARTWORK_COPY_EXTENSIONS else "mjpeg",
+            "-disposition:v",
+            "attached_pic",
+            "-metadata:s:v",
+            "comment=Cover (front)",
+        ]
+    elif copy_audio:
+        # Keep any cover the source mp3 already has.
+        args += ["-map", "0:a", "-map", "0:v?", "-c:v", "copy"]
+    else:
+        args += ["-map", "0:a"]
+    args += ["-c:a", "copy"] if copy_audio else ["-b:a", "320k"]
+    args += ["-threads", str(settings.ffmpeg_threads), "-write_xing", "0"]
+    for key, value in metadata.items():
+        args += ["-metadata", f"{key}={value}"]
 
-async def convert_audio_to_mp3(audio_file: str):
-    file = Path(audio_file)
-    if file.suffix == ".mp3":
-        return audio_file
-    output_filename = f"{file.stem}.mp3"
     process = await asyncio.subprocess.create_subprocess_exec(
         "ffmpeg",
-        "-i",
-        audio_file,
-        "-b:a",
-        "320k",
-        output_filename,
+        *args,
+        "-f",
+        "mp3",
+        "pipe:1",
+        stdin=asyncio.subprocess.PIPE if piped else asyncio.subprocess.DEVNULL,
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.PIPE,
     )
-    error = await process.stderr.read()
-    await process.wait()
+
+    async def _feed():
+        try:
+            async for chunk in source:
+                process.stdin.write(chunk)
+                await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # ffmpeg exited early, its stderr says why.
+            pass
+        finally:
+            process.stdin.close()
+
+    feed = asyncio.create_task(_feed()) if piped else None
+    error = asyncio.create_task(process.stderr.read())
+    try:
+        while chunk := await process.stdout.read(OUTPUT_CHUNK_SIZE):
+            yield chunk
+        if feed:
+            await feed
+        await process.wait()
+    except BaseException:
+        if process.returncode is None:
+            process.kill()
+        for task in (feed, error):
+            if task:
+                task.cancel()
+        await process.wait()
+        raise
     if process.returncode != 0:
-        raise Exception(error.decode())
-    return output_filename
+        raise Exception((await error).decode())
@@ -2,10 +2,11 @@ import logging
 import traceback
 from urllib.parse import urljoin
 
+import httpx
 from bs4 import BeautifulSoup
 from pydantic import BaseModel
 
-from app.services import httpclient
+from app.services import httpclient, quota
 from app.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -14,6 +15,14 @@ logger = logging.getLogger(__name__)
 YOUTUBE_API = "https://youtube.googleapis.com"
 
 
+async def _get_youtube_api(client: httpx.AsyncClient, path: str, params: dict):
+    response = await client.get(urljoin(YOUTUBE_API, path), params=params)
+    # Failed requests are still charged against the daily quota.
+    await quota.record_usage(endpoint=path)
+    response.raise_for_status()
+    return response.json()
+
+
 class YoutubeChannelInfo(BaseModel):
     id: str
     title: str
@@ -28,11 +37,9 @@ async def get_channel_subscriptions(channel_id: str):
     }
     async with httpclient.AsyncClient() as client:
         while True:
-            response = await client.get(
-                urljoin(YOUTUBE_API, "/youtube/v3/subscriptions"), params=params
+            json = await _get_youtube_api(
+                client, "/youtube/v3/subscriptions", params=params
             )
-            response.raise_for_status()
-            json = response.json()
             channels: list[YoutubeChannelInfo] = []
             for item in json.get("items", []):
                 snippet = item.get("snippet")
@@ -85,39 +92,32 @@ async def get_channel_info(channel_id: str):
             return None
 
 
-async def _get_channel_upload_playlist_id(channel_id: str):
+async def get_channel_upload_playlist_id(channel_id: str):
     params = {
         "part": "contentDetails",
         "id": channel_id,
         "key": settings.google_api_key,
     }
     async with httpclient.AsyncClient() as client:
-        response = await client.get(
-            urljoin(YOUTUBE_API, "/youtube/v3/channels"), params=params
-        )
-        response.raise_for_status()
-        json = response.json()
+        json = await _get_youtube_api(client, "/youtube/v3/channels", params=params)
         uploads_playlist_id = json["items"][0]["contentDetails"]["relatedPlaylists"][
             "uploads"
         ]
         return uploads_playlist_id
 
 
-async def _get_channel_upload_playlist_videos(channel_id: str):
-    channel_upload_playlist_id = await _get_channel_upload_playlist_id(channel_id)
+async def get_playlist_video_ids(playlist_id: str):
     params = {
         "part": "contentDetails",
-        "playlistId": channel_upload_playlist_id,
+        "playlistId": playlist_id,
         "maxResults": 50,
         "key": settings.google_api_key,
     }
     async with httpclient.AsyncClient() as client:
         while True:
-            response = await client.get(
-                urljoin(YOUTUBE_API, "/youtube/v3/playlistItems"), params=params
+            json = await _get_youtube_api(
+                client, "/youtube/v3/playlistItems", params=params
             )
-            response.raise_for_status()
-            json = response.json()
             video_ids = []
             for item in json.get("items", []):
                 content_details = item.get("contentDetails")
@@ -138,43 +138,44 @@ class YoutubeVideoInfo(BaseModel):
     published: str
 
 
-async def get_channel_latest_videos(channel_id: str):
-    async for video_ids in _get_channel_upload_playlist_videos(channel_id):
-        params = {
-            "part": "snippet",
-            "id": ",".join(video_ids),
-            "key": settings.google_api_key,
-        }
-        async with httpclient.AsyncClient() as client:
-            response = await client.get(
-                urljoin(YOUTUBE_API, "/youtube/v3/videos"), params=params
-            )
-            response.raise_for_status()
-            json = response.json()
-            videos: list[YoutubeVideoInfo] = []
-            for item in json.get("items", []):
-                snippet = item.get("snippet")
-                video_id = item.get("id")
-                title = snippet.get("title")
-                category_id = int(snippet.get("categoryId"))
-                description = snippet.get("description")
-                published = snippet.get("publishedAt")
-                thumbnails = snippet.get("thumbnails")
-                video_thumbnail = thumbnails.get("high", {}).get("url")
-                try:
-                    videos.append(
-                        YoutubeVideoInfo(
-                            id=video_id,
-                            title=title,
-                            thumbnail=video_thumbnail,
-                            category_id=category_id,
-                            description=description,
-                            published=published,
-                        )
+async def get_videos_info(video_ids: list[str]):
+    params = {
+        "part": "snippet",
+        "id": ",".join(video_ids),
+        "key": settings.google_api_key,
+    }
+    async with httpclient.AsyncClient() as client:
+        json = await _get_youtube_api(client, "/youtube/v3/videos", params=params)
+        videos: list[YoutubeVideoInfo] = []
+        for item in json.get("items", []):
+            snippet = item.get("snippet")
+            video_id = item.get("id")
+            title = snippet.get("title")
+            category_id = int(snippet.get("categoryId"))
+            description = snippet.get("description")
+            published = snippet.get("publishedAt")
+            thumbnails = snippet.get("thumbnails")
+            video_thumbnail = thumbnails.get("high", {}).get("url")
+            try:
+                videos.append(
+                    YoutubeVideoInfo(
+                        id=video_id,
+                        title=title,
+                        thumbnail=video_thumbnail,
+                        category_id=category_id,
+                        description=description,
+                        published=published,
                     )
-                except TypeError:
-                    logger.exception(traceback.format_exc())
-            yield videos
+                )
+            except TypeError:
+                logger.exception(traceback.format_exc())
+        return videos
+
+
+async def get_channel_latest_videos(channel_id: str):
+    uploads_playlist_id = await get_channel_upload_playlist_id(channel_id)
+    async for video_ids in get_playlist_video_ids(uploads_playlist_id):
+        yield await get_videos_info(video_ids)
 
 
 class YoutubeVideoCategory(BaseModel):
@@ -189,11 +190,9 @@ async def get_video_category(category_id: str):
         "key": settings.google_api_key,
     }
     async with httpclient.AsyncClient() as client:
-        response = await client.get(
-            urljoin(YOUTUBE_API, "/youtube/v3/videoCategories"), params=params
+        json = await _get_youtube_api(
+            client, "/youtube/v3/videoCategories", params=params
         )
-        response.raise_for_status()
-        json = response.json()
         category = json["items"][0]["snippet"]["title"]
         try:
             return YoutubeVideoCategory(id=category_id, name=category)
@@ -210,11 +209,9 @@ async def get_video_categories():
     }
     async with httpclient.AsyncClient() as client:
         while True:
-            response = await client.get(
-                urljoin(YOUTUBE_API, "/youtube/v3/videoCategories"), params=params
+            json = await _get_youtube_api(
+                client, "/youtube/v3/videoCategories", params=params
             )
-            response.raise_for_status()
-            json = response.json()
             categories: list[YoutubeVideoCategory] = []
             for item in json.get("items", []):
                 category_id = int(item.get("id"))
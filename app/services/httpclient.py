@@ -1,11 +1,105 @@
 from contextlib import asynccontextmanager
+from dataclasses import dataclass
 
+import httpcore
 import httpx
 
+from app.settings import settings
+
+_client: httpx.AsyncClient | None = None
+_transports: dict[str, httpx.AsyncHTTPTransport] = {}
+
+
+@dataclass
+class PoolStats:
+    host: str
+    max_connections: int
+    connections: int
+    idle_connections: int
+    http2_connections: int
+
+
+def _create_transport(max_connections: int):
+    return httpx.AsyncHTTPTransport(
+        http2=settings.http_http2,
+        retries=settings.http_retries,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(
+                max_connections, settings.http_max_keepalive_connections
+            ),
+            keepalive_expiry=settings.http_keepalive_expiry,
+        ),
+    )
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _transports.clear()
+        _transports["all://"] = _create_transport(settings.http_max_connections)
+        for host, max_connections in settings.http_host_max_connections.items():
+            _transports[f"all://{host}"] = _create_transport(max_connections)
+        _client = httpx.AsyncClient(
+            transport=_transports["all://"],
+            mounts={
+                pattern: transport
+                for pattern, transport in _transports.items()
+                if pattern != "all://"
+            },
+            timeout=httpx.Timeout(
+                settings.http_timeout, connect=settings.http_connect_timeout
+            ),
+            follow_redirects=True,
+        )
+    return _client
+
+
+def reset_client():
+    # Forked processes must not reuse sockets opened by their parent.
+    global _client
+    _client = None
+    _transports.clear()
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+    reset_client()
+
+
+def _get_connections(transport: httpx.AsyncHTTPTransport):
+    # httpx exposes no pool stats, so this is the one place that reaches into
+    # httpcore's pool and its connections.
+    return [
+        (
+            connection.is_idle(),
+            isinstance(connection._connection, httpcore.AsyncHTTP2Connection),
+        )
+        for connection in transport._pool.connections
+    ]
+
+
+def get_pool_stats():
+    stats: list[PoolStats] = []
+    for pattern, transport in _transports.items():
+        host = pattern.removeprefix("all://")
+        connections = _get_connections(transport)
+        stats.append(
+            PoolStats(
+                host=host or "*",
+                max_connections=settings.http_host_max_connections.get(
+                    host, settings.http_max_connections
+                ),
+                connections=len(connections),
+                idle_connections=len([idle for idle, _ in connections if idle]),
+                http2_connections=len([http2 for _, http2 in connections if http2]),
+            )
+        )
+    return stats
+
 
 @asynccontextmanager
 async def AsyncClient():
-    async with httpx.AsyncClient(
-        transport=httpx.AsyncHTTPTransport(retries=3), follow_redirects=True
-    ) as client:
-        yield client
+    yield get_client()
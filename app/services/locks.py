@@ -0,0 +1,162 @@
+import time
+import uuid
+
+from app.services.redisclient import RedisClient
+
+# Holders are scored by when their slot expires so a worker that dies without
+# releasing only blocks the slot until its timeout.
+ACQUIRE_SEMAPHORE_SCRIPT = """
+redis.call("ZREMRANGEBYSCORE", KEYS[1], "-inf", ARGV[1])
+if redis.call("ZCARD", KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call("ZADD", KEYS[1], ARGV[3], ARGV[4])
+    redis.call("PEXPIRE", KEYS[1], ARGV[5])
+    return 1
+end
+return 0
+"""
+
+# Only a slot that is still held can be extended, one that already expired and
+# was removed may have been handed to someone else.
+EXTEND_SEMAPHORE_SCRIPT = """
+if not redis.call("ZSCORE", KEYS[1], ARGV[2]) then
+    return 0
+end
+redis.call("ZADD", KEYS[1], "XX", ARGV[1], ARGV[2])
+redis.call("PEXPIRE", KEYS[1], ARGV[3])
+return 1
+"""
+
+
+class Semaphore:
+    def __init__(self, name: str, limit: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.timeout = timeout
+        self.token = str(uuid.uuid4())
+
+    async def acquire(self):
+        now = time.time()
+        async with RedisClient() as redis:
+            acquired = await redis.eval(
+                ACQUIRE_SEMAPHORE_SCRIPT,
+                1,
+                self.name,
+                now,
+                self.limit,
+                now + self.timeout,
+                self.token,
+                int(self.timeout * 1000),
+            )
+        return bool(acquired)
+
+    async def extend(self):
+        async with RedisClient() as redis:
+            extended = await redis.eval(
+                EXTEND_SEMAPHORE_SCRIPT,
+                1,
+                self.name,
+                time.time() + self.timeout,
+                self.token,
+                int(self.timeout * 1000),
+            )
+        return bool(extended)
+
+    async def release(self):
+        async with RedisClient() as redis:
+            await redis.zrem(self.name, self.token)
+
+
+ACQUIRE_SINGLE_FLIGHT_SCRIPT = """
+if redis.call("SET", KEYS[1], ARGV[1], "NX", "PX", ARGV[2]) then
+    return 1
+end
+redis.call("RPUSH", KEYS[2], ARGV[3])
+redis.call("PEXPIRE", KEYS[2], ARGV[2])
+return 0
+"""
+
+EXTEND_SINGLE_FLIGHT_SCRIPT = """
+if redis.call("GET", KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call("PEXPIRE", KEYS[1], ARGV[2])
+redis.call("PEXPIRE", KEYS[2], ARGV[2])
+return 1
+"""
+
+RELEASE_SINGLE_FLIGHT_SCRIPT = """
+if redis.call("GET", KEYS[1]) ~= ARGV[1] then
+    return {}
+end
+local pending = redis.call("LRANGE", KEYS[2], 0, -1)
+redis.call("DEL", KEYS[1], KEYS[2])
+return pending
+"""
+
+
+class SingleFlight:
+    """
+    Lets one run hold a name at a time. Requests made while it is held are
+    queued instead of running, and handed back on release so they can be
+    merged into a single follow up run. Taking the lock and queueing, and
+    releasing and draining the queue, are each atomic so no request is lost
+    in between.
+    """
+
+    def __init__(self, name: str, timeout: float):
+        self.name = name
+        self.timeout = timeout
+        self.token = str(uuid.uuid4())
+
+    @staticmethod
+    def lock_key(name: str):
+        return f"{name}:lock"
+
+    @staticmethod
+    def pending_key(name: str):
+        return f"{name}:pending"
+
+    @property
+    def keys(self):
+        return [self.lock_key(self.name), self.pending_key(self.name)]
+
+    async def acquire(self, request: str):
+        async with RedisClient() as redis:
+            acquired = await redis.eval(
+                ACQUIRE_SINGLE_FLIGHT_SCRIPT,
+                2,
+                *self.keys,
+                self.token,
+                int(self.timeout * 1000),
+                request,
+            )
+        return bool(acquired)
+
+    async def extend(self):
+        async with RedisClient() as redis:
+            extended = await redis.eval(
+                EXTEND_SINGLE_FLIGHT_SCRIPT,
+                2,
+                *self.keys,
+                self.token,
+                int(self.timeout * 1000),
+            )
+        return bool(extended)
+
+    async def release(self):
+        async with RedisClient() as redis:
+            pending = await redis.eval(
+                RELEASE_SINGLE_FLIGHT_SCRIPT, 2, *self.keys, self.token
+            )
+        return [request.decode() for request in pending]
+
+    @classmethod
+    async def held(cls, names: list[str]):
+        if not names:
+            return set()
+        async with RedisClient() as redis:
+            async with redis.pipeline(transaction=False) as pipe:
+                for name in names:
+                    pipe.exists(cls.lock_key(name))
+                results = await pipe.execute()
+        return {name for name, exists in zip(names, results) if exists}
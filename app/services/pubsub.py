@@ -1,57 +1,402 @@
 import asyncio
+import logging
+import re
+import traceback
 from contextlib import asynccontextmanager
 
 from redis.asyncio import Redis
+from redis.asyncio.client import PubSub as RedisPubSub
+from redis.exceptions import ResponseError
 
+from app.services import redisclient
 from app.settings import settings
 
+logger = logging.getLogger(__name__)
+
+SUBSCRIBE_TIMEOUT = 10
+READ_TIMEOUT = 1
+
+STREAM_DATA_FIELD = "data"
+STREAM_START = "0-0"
+STREAM_ID_PATTERN = re.compile(r"^\d+-\d+$")
+
+
+class Subscription:
+    def __init__(self, channels: list[str], maxsize: int):
+        self.channels = channels
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def put(self, message: dict):
+        # The reader is shared by every subscription, so a slow listener loses
+        # its oldest messages instead of holding up everyone else's.
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    def clear(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+    async def get(self, timeout: float | None = None):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except TimeoutError:
+            return None
+
+
+class Subscriber:
+    """
+    Multiplexes every listener in the process over a single Redis pubsub
+    connection. A channel is subscribed in Redis while at least one listener
+    wants it, and each message is copied into the queue of every listener of
+    its channel.
+    """
+
+    def __init__(self):
+        self._redis: Redis | None = None
+        self._pubsub: RedisPubSub | None = None
+        self._reader: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+        self._subscriptions: dict[str, set[Subscription]] = {}
+        self._subscribed: dict[str, asyncio.Event] = {}
+
+    @property
+    def channels(self):
+        return list(self._subscriptions.keys())
+
+    def _dispatch(self, message: dict):
+        channel = message["channel"].decode()
+        if message["type"] == "subscribe":
+            if event := self._subscribed.get(channel):
+                event.set()
+        elif message["type"] == "message":
+            for subscription in self._subscriptions.get(channel, ()):
+                subscription.put(message)
+
+    async def _read(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(timeout=READ_TIMEOUT)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # redis-py reconnects and resubscribes on the next read.
+                logger.exception(traceback.format_exc())
+                await asyncio.sleep(READ_TIMEOUT)
+                continue
+            if message:
+                self._dispatch(message)
+
+    @asynccontextmanager
+    async def subscribe(self, channels: list[str]):
+        subscription = Subscription(
+            channels=channels, maxsize=settings.pubsub_queue_size
+        )
+        subscribed: list[asyncio.Event] = []
+        try:
+            async with self._lock:
+                if self._pubsub is None:
+                    self._redis = Redis(
+                        connection_pool=redisclient.get_connection_pool()
+                    )
+                    self._pubsub = self._redis.pubsub()
+                new_channels = [
+                    channel
+                    for channel in channels
+                    if channel not in self._subscriptions
+                ]
+                for channel in channels:
+                    self._subscriptions.setdefault(channel, set()).add(subscription)
+                for channel in new_channels:
+                    self._subscribed[channel] = asyncio.Event()
+                subscribed = [self._subscribed[channel] for channel in channels]
+                if new_channels:
+                    await self._pubsub.subscribe(*new_channels)
+                    if self._reader is None:
+                        self._reader = asyncio.create_task(self._read())
+            # Wait for Redis to confirm so nothing published after this returns
+            # is missed.
+            async with asyncio.timeout(SUBSCRIBE_TIMEOUT):
+                for event in subscribed:
+                    await event.wait()
+            yield subscription
+        finally:
+            async with self._lock:
+                unused_channels = []
+                for channel in channels:
+                    subscriptions = self._subscriptions.get(channel)
+                    if subscriptions is None:
+                        continue
+                    subscriptions.discard(subscription)
+                    if not subscriptions:
+                        del self._subscriptions[channel]
+                        del self._subscribed[channel]
+                        unused_channels.append(channel)
+                if unused_channels and self._pubsub is not None:
+                    await self._pubsub.unsubscribe(*unused_channels)
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+        if self._redis is not None:
+            await self._redis.aclose()
+        self._reader = None
+        self._pubsub = None
+        self._redis = None
+
+
+_subscriber: Subscriber | None = None
+
+
+def get_subscriber():
+    global _subscriber
+    if _subscriber is None:
+        _subscriber = Subscriber()
+    return _subscriber
+
+
+def reset_subscriber():
+    # Forked processes must not reuse sockets opened by their parent.
+    global _subscriber
+    _subscriber = None
+
+
+async def close_subscriber():
+    if _subscriber is not None:
+        await _subscriber.close()
+    reset_subscriber()
+
+
+def get_stream_key(channel: str):
+    return f"stream:{channel}"
+
+
+async def read_stream(channel: str, after: str, count: int = 100):
+    """
+    Messages published to the channel after the given stream id, oldest first,
+    as (id, data) pairs.
+    """
+
+    async with redisclient.RedisClient() as redis:
+        entries = await redis.xrange(
+            get_stream_key(channel), min=f"({after}", count=count
+        )
+    return [(id.decode(), fields[STREAM_DATA_FIELD.encode()]) for id, fields in entries]
+
+
+async def get_stream_cursor(channel: str):
+    async with redisclient.RedisClient() as redis:
+        entries = await redis.xrevrange(get_stream_key(channel), count=1)
+    return entries[0][0].decode() if entries else STREAM_START
+
+
+def _parse_stream_id(id: str | bytes):
+    if isinstance(id, bytes):
+        id = id.decode()
+    milliseconds, _, sequence = id.partition("-")
+    return int(milliseconds), int(sequence or 0)
+
+
+async def is_stream_truncated(channel: str, after: str):
+    """
+    Whether messages published after the given stream id have since been
+    trimmed from the stream or expired with it, so reading from it would
+    silently skip them. A cursor at the last trimmed message also reports as
+    truncated, the stream no longer tells it apart from one further back.
+    """
+
+    if after == STREAM_START:
+        return False
+    async with redisclient.RedisClient() as redis:
+        try:
+            info = await redis.xinfo_stream(get_stream_key(channel))
+        except ResponseError:
+            return True
+    if info["entries-added"] == info["length"]:
+        # Nothing was ever removed from the stream.
+        return False
+    after = _parse_stream_id(after)
+    # Trimming to pubsub_stream_max_length only moves the first entry forward,
+    # max-deleted-entry-id is only kept up to date by XDEL.
+    first_entry = info.get("first-entry")
+    if first_entry:
+        if after < _parse_stream_id(first_entry[0]):
+            return True
+    elif after < _parse_stream_id(info["last-generated-id"]):
+        return True
+    max_deleted_id = info.get("max-deleted-entry-id")
+    return bool(max_deleted_id) and after < _parse_stream_id(max_deleted_id)
+
+
+def _get_offsets_key(channel: str):
+    return f"offsets:{channel}"
+
+
+async def get_offset(channel: str, consumer: str):
+    async with redisclient.RedisClient() as redis:
+        offset = await redis.hget(_get_offsets_key(channel), consumer)
+    return offset.decode() if offset else None
+
+
+async def set_offset(channel: str, consumer: str, offset: str):
+    # Offsets only matter while the stream they point into exists.
+    key = _get_offsets_key(channel)
+    async with redisclient.RedisClient() as redis:
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hset(key, consumer, offset)
+            pipe.expire(key, settings.pubsub_stream_ttl)
+            await pipe.execute()
+
+
+async def get_events_since(
+    channel: str, cursor: str | None, consumer: str | None = None, count: int = 100
+):
+    """
+    Up to count messages published to the channel after the cursor, the new
+    cursor to continue from, and whether messages after the cursor were lost
+    to trimming. Without a cursor a consumer resumes from its stored offset,
+    which then moves to the new cursor.
+    """
+
+    if cursor is None and consumer:
+        cursor = await get_offset(channel, consumer=consumer)
+    cursor = cursor or STREAM_START
+    truncated = await is_stream_truncated(channel, after=cursor)
+    events = await read_stream(channel, after=cursor, count=count)
+    if events:
+        cursor = events[-1][0]
+    if consumer:
+        await set_offset(channel, consumer=consumer, offset=cursor)
+    return events, cursor, truncated
+
+
+class Publisher:
+    """
+    Buffers published messages and sends them in one pipeline once
+    pubsub_debounce_window seconds have passed since the first was buffered.
+    Messages published with the same key inside the window are coalesced, only
+    the last one is sent. With no window every message is sent immediately.
+    """
+
+    def __init__(self):
+        self._pending: dict[str | int, tuple[list[str], bytes]] = {}
+        self._unkeyed = 0
+        self._flusher: asyncio.Task | None = None
+
+    async def publish(self, channels: list[str], message: str, key: str | None = None):
+        if not channels:
+            return
+        if settings.pubsub_debounce_window <= 0:
+            await self._send([(channels, message.encode())])
+            return
+        if key is None:
+            self._unkeyed += 1
+            pending_key = self._unkeyed
+        else:
+            pending_key = key
+            # Move a coalesced message behind anything published since.
+            self._pending.pop(pending_key, None)
+        self._pending[pending_key] = (channels, message.encode())
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(settings.pubsub_debounce_window)
+        self._flusher = None
+        await self._flush_or_log()
+
+    async def _flush_or_log(self):
+        # For flushes nobody awaits, or that run while another error or result
+        # is being returned. The buffered messages are lost either way.
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception(traceback.format_exc())
+
+    async def flush(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        pending, self._pending = list(self._pending.values()), {}
+        if pending:
+            await self._send(pending)
+
+    async def _send(self, messages: list[tuple[list[str], bytes]]):
+        async with redisclient.RedisClient() as redis:
+            async with redis.pipeline(transaction=False) as pipe:
+                for channels, message in messages:
+                    for channel in channels:
+                        # Appended before publishing, so a listener woken by
+                        # the message always finds it in the stream.
+                        stream = get_stream_key(channel)
+                        pipe.xadd(
+                            stream,
+                            {STREAM_DATA_FIELD: message},
+                            maxlen=settings.pubsub_stream_max_length,
+                            approximate=True,
+                        )
+                        pipe.expire(stream, settings.pubsub_stream_ttl)
+                        pipe.publish(channel=channel, message=message)
+                await pipe.execute()
+
+
+_publisher: Publisher | None = None
+
+
+def get_publisher():
+    global _publisher
+    if _publisher is None:
+        _publisher = Publisher()
+    return _publisher
+
+
+def reset_publisher():
+    # Buffered messages belong to the parent process.
+    global _publisher
+    _publisher = None
+
+
+async def flush_publisher():
+    if _publisher is not None:
+        await _publisher._flush_or_log()
+
 
 class PubSub:
     class Channels:
         MUSIC_JOB_UPDATE = "MUSIC_JOB_UPDATE"
         YOUTUBE_CHANNEL_UPDATE = "YOUTUBE_CHANNEL_UPDATE"
 
+        @staticmethod
+        def for_user(channel: str, email: str):
+            # Updates are published to each user that may see them, so
+            # listeners never receive anything they would have to filter out.
+            return f"{channel}:{email}"
+
     def __init__(self, channels: list[str]):
         self.channels = channels
 
-    @asynccontextmanager
-    async def _get_redis(self):
-        redis = Redis.from_url(settings.redis_url)
-        try:
-            yield redis
-        finally:
-            await redis.aclose()
+    def _get_redis(self):
+        return redisclient.RedisClient()
 
-    async def listen(self, ignore_subscribe_messages=False, timeout=60):
-        async with self._get_redis() as redis:
-            pubsub = redis.pubsub()
-            await pubsub.subscribe(*self.channels)
+    async def listen(self, timeout=60):
+        async with get_subscriber().subscribe(self.channels) as subscription:
             self._listen = True
             while self._listen:
-                message = await pubsub.get_message(
-                    ignore_subscribe_messages=False, timeout=timeout
-                )
-                if (
-                    ignore_subscribe_messages
-                    and message
-                    and message["type"] == "subscribe"
-                ):
-                    continue
-                yield message
-            await pubsub.unsubscribe()
+                yield await subscription.get(timeout=timeout)
 
     def stop_listening(self):
         self._listen = False
 
-    async def publish_message(self, message: str):
-        async with self._get_redis() as redis:
-            encoded_message = message.encode()
-            await asyncio.gather(
-                *[
-                    redis.publish(channel=channel, message=encoded_message)
-                    for channel in self.channels
-                ]
-            )
+    async def publish_message(self, message: str, key: str | None = None):
+        await get_publisher().publish(channels=self.channels, message=message, key=key)
 
     async def close(self):
         await self.close()
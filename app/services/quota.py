@@ -0,0 +1,90 @@
+import math
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from app.services.redisclient import RedisClient
+from app.settings import settings
+
+# The YouTube Data API quota resets at midnight Pacific time.
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+ENDPOINT_COSTS = {
+    "/youtube/v3/channels": 1,
+    "/youtube/v3/playlistItems": 1,
+    "/youtube/v3/search": 100,
+    "/youtube/v3/subscriptions": 1,
+    "/youtube/v3/videoCategories": 1,
+    "/youtube/v3/videos": 1,
+}
+
+TOTAL_FIELD = "total"
+
+
+@dataclass
+class QuotaUsage:
+    date: date
+    limit: int
+    used: int
+    remaining: int
+    endpoints: dict[str, int]
+
+
+def get_quota_date():
+    return datetime.now(QUOTA_TIMEZONE).date()
+
+
+def _quota_key(quota_date: date):
+    return f"youtube:quota:{quota_date.isoformat()}"
+
+
+def get_reset_time():
+    tomorrow = get_quota_date() + timedelta(days=1)
+    return datetime.combine(tomorrow, time.min, tzinfo=QUOTA_TIMEZONE)
+
+
+async def record_usage(endpoint: str, units: int | None = None):
+    if units is None:
+        units = ENDPOINT_COSTS.get(endpoint, 1)
+    key = _quota_key(get_quota_date())
+    async with RedisClient() as redis:
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.hincrby(key, endpoint, units)
+            pipe.hincrby(key, TOTAL_FIELD, units)
+            pipe.expire(key, timedelta(days=2))
+            await pipe.execute()
+
+
+async def get_usage():
+    quota_date = get_quota_date()
+    async with RedisClient() as redis:
+        fields = await redis.hgetall(_quota_key(quota_date))
+    endpoints = {
+        field.decode(): int(value)
+        for field, value in fields.items()
+        if field.decode() != TOTAL_FIELD
+    }
+    used = int(fields.get(TOTAL_FIELD.encode(), 0))
+    return QuotaUsage(
+        date=quota_date,
+        limit=settings.google_api_daily_quota,
+        used=used,
+        remaining=max(settings.google_api_daily_quota - used, 0),
+        endpoints=endpoints,
+    )
+
+
+async def get_sweep_budget(sweep_interval: timedelta):
+    """
+    Units a periodic sweep may spend, splitting what is left of today's quota
+    (minus the reserve kept for user initiated requests) evenly across the
+    sweeps remaining before the quota resets.
+    """
+
+    usage = await get_usage()
+    spendable = usage.remaining - settings.google_api_quota_reserve
+    if spendable <= 0:
+        return 0
+    until_reset = get_reset_time() - datetime.now(QUOTA_TIMEZONE)
+    sweeps_remaining = max(math.ceil(until_reset / sweep_interval), 1)
+    return spendable // sweeps_remaining
@@ -0,0 +1,38 @@
+from contextlib import asynccontextmanager
+
+from redis.asyncio import ConnectionPool, Redis
+
+from app.settings import settings
+
+_connection_pool: ConnectionPool | None = None
+
+
+def get_connection_pool():
+    global _connection_pool
+    if _connection_pool is None:
+        _connection_pool = ConnectionPool.from_url(
+            settings.redis_url, max_connections=settings.redis_max_connections
+        )
+    return _connection_pool
+
+
+def reset_connection_pool():
+    # Forked processes must not reuse sockets opened by their parent.
+    global _connection_pool
+    _connection_pool = None
+
+
+async def close_connection_pool():
+    global _connection_pool
+    if _connection_pool is not None:
+        await _connection_pool.aclose()
+        _connection_pool = None
+
+
+@asynccontextmanager
+async def RedisClient():
+    redis = Redis(connection_pool=get_connection_pool())
+    try:
+        yield redis
+    finally:
+        await redis.aclose()
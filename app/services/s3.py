@@ -1,27 +1,76 @@
 import asyncio
+from collections.abc import AsyncIterable
+from contextlib import AsyncExitStack
+from pathlib import Path
 from urllib.parse import urljoin, urlparse, urlunparse
 
-import boto3
-from botocore.config import Config
+from aiobotocore.client import AioBaseClient
+from aiobotocore.config import AioConfig
+from aiobotocore.session import get_session
+from botocore.exceptions import ClientError
 
 from app.settings import settings
+from app.utils.files import iter_file
 
-_client = boto3.client(
-    "s3",
-    endpoint_url=settings.aws_endpoint_url,
-    region_name=settings.aws_region_name,
-    aws_access_key_id=settings.aws_access_key_id,
-    aws_secret_access_key=settings.aws_secret_access_key,
-    config=Config(s3={"addressing_style": "virtual"}),
-)
+# DeleteObjects accepts at most this many keys per request.
+MAX_DELETE_OBJECTS = 1000
+
+_client: AioBaseClient | None = None
+_exit_stack: AsyncExitStack | None = None
+
+
+def _endpoint_url():
+    return settings.aws_s3_endpoint_url or settings.aws_endpoint_url
+
+
+async def get_client():
+    global _client, _exit_stack
+    if _client is None:
+        exit_stack = AsyncExitStack()
+        client = await exit_stack.enter_async_context(
+            get_session().create_client(
+                "s3",
+                endpoint_url=_endpoint_url(),
+                region_name=settings.aws_region_name,
+                aws_access_key_id=settings.aws_access_key_id,
+                aws_secret_access_key=settings.aws_secret_access_key,
+                config=AioConfig(
+                    s3={"addressing_style": settings.aws_s3_addressing_style},
+                    max_pool_connections=settings.aws_s3_max_pool_connections,
+                ),
+            )
+        )
+        # Another caller may have created the client while this one was
+        # connecting.
+        if _client is not None:
+            await exit_stack.aclose()
+        else:
+            _client, _exit_stack = client, exit_stack
+    return _client
+
+
+def reset_client():
+    # Forked processes must not reuse sockets opened by their parent.
+    global _client, _exit_stack
+    _client = None
+    _exit_stack = None
+
+
+async def close_client():
+    if _exit_stack is not None:
+        await _exit_stack.aclose()
+    reset_client()
 
 
 def resolve_url(filename: str):
-    url = urlparse(urljoin(settings.aws_endpoint_url, filename))
-    netloc = f"{settings.aws_s3_bucket}.{url.netloc}"
-    return urlunparse(
-        [url.scheme, netloc, url.path, url.params, url.query, url.fragment]
-    )
+    url = urlparse(urljoin(_endpoint_url(), filename))
+    if settings.aws_s3_addressing_style == "path":
+        netloc = url.netloc
+        path = f"/{settings.aws_s3_bucket}{url.path}"
+    else:
+        netloc = f"{settings.aws_s3_bucket}.{url.netloc}"
+        path = url.path
+    return urlunparse([url.scheme, netloc, path, url.params, url.query, url.fragment])
 
 
 async def upload_file(
@@ -30,8 +79,8 @@ async def upload_file(
     content_type: str,
     acl="public-read",
 ):
-    return await asyncio.to_thread(
-        _client.put_object,
+    client = await get_client()
+    return await client.put_object(
         Bucket=settings.aws_s3_bucket,
         Key=filename,
         Body=body,
@@ -40,25 +89,180 @@ async def upload_file(
     )
 
 
-async def delete_file(filename: str):
-    return await asyncio.to_thread(
-        _client.delete_object, Bucket=settings.aws_s3_bucket, Key=filename
+async def generate_presigned_post(
+    filename: str,
+    content_type: str,
+    max_size: int,
+    expires_in: int,
+    acl="public-read",
+):
+    """
+    Presign a browser form POST straight to the bucket. S3 rejects the upload
+    unless it has this key, this content type and acl, and is at most
+    max_size bytes.
+    """
+
+    client = await get_client()
+    return await client.generate_presigned_post(
+        Bucket=settings.aws_s3_bucket,
+        Key=filename,
+        Fields={"acl": acl, "Content-Type": content_type},
+        Conditions=[
+            {"acl": acl},
+            {"Content-Type": content_type},
+            ["content-length-range", 1, max_size],
+        ],
+        ExpiresIn=expires_in,
     )
 
 
+async def head_file(filename: str):
+    client = await get_client()
+    try:
+        return await client.head_object(Bucket=settings.aws_s3_bucket, Key=filename)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+            return None
+        raise
+
+
+async def delete_file(filename: str):
+    client = await get_client()
+    return await client.delete_object(Bucket=settings.aws_s3_bucket, Key=filename)
+
+
+async def delete_files(filenames: list[str]):
+    client = await get_client()
+    for i in range(0, len(filenames), MAX_DELETE_OBJECTS):
+        response = await client.delete_objects(
+            Bucket=settings.aws_s3_bucket,
+            Delete={
+                "Objects": [
+                    {"Key": filename}
+                    for filename in filenames[i : i + MAX_DELETE_OBJECTS]
+                ],
+                "Quiet": True,
+            },
+        )
+        if errors := response.get("Errors"):
+            raise Exception(f"Failed to delete files: {errors}")
+
+
 async def list_filenames(prefix: str = ""):
-    continuation_token = ""
-    while True:
-        params = {"Bucket": settings.aws_s3_bucket}
-        if prefix:
-            params["Prefix"] = prefix
-        if continuation_token:
-            params["ContinuationToken"] = continuation_token
-        response = await asyncio.to_thread(_client.list_objects_v2, **params)
+    client = await get_client()
+    params = {"Bucket": settings.aws_s3_bucket}
+    if prefix:
+        params["Prefix"] = prefix
+    async for response in client.get_paginator("list_objects_v2").paginate(**params):
         objects: list[str] = list(
             map(lambda object: object["Key"], response.get("Contents", []))
         )
         yield objects
-        if not response.get("IsTruncated"):
-            break
-        continuation_token = response.get("NextContinuationToken", "")
+
+
+async def _iter_parts(source: AsyncIterable[bytes], part_size: int):
+    buffer = bytearray()
+    async for chunk in source:
+        buffer.extend(chunk)
+        while len(buffer) >= part_size:
+            yield bytes(buffer[:part_size])
+            del buffer[:part_size]
+    if buffer:
+        yield bytes(buffer)
+
+
+async def _upload_part(
+    filename: str,
+    upload_id: str,
+    part_number: int,
+    body: bytes,
+    semaphore: asyncio.Semaphore,
+):
+    try:
+        client = await get_client()
+        response = await client.upload_part(
+            Bucket=settings.aws_s3_bucket,
+            Key=filename,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=body,
+        )
+        return {"ETag": response["ETag"], "PartNumber": part_number}
+    finally:
+        semaphore.release()
+
+
+async def upload_stream(
+    filename: str,
+    source: str | Path | AsyncIterable[bytes],
+    content_type: str,
+    acl="public-read",
+):
+    """
+    Upload from a file path or an async iterator of bytes without holding the
+    whole file in memory. At most aws_s3_upload_concurrency parts of
+    aws_s3_part_size bytes are buffered at once. Sources that fit in a single
+    part are sent with one put_object instead.
+    """
+
+    if isinstance(source, (str, Path)):
+        source = iter_file(source)
+    parts = aiter(_iter_parts(source, part_size=settings.aws_s3_part_size))
+    first_part = await anext(parts, None)
+    second_part = await anext(parts, None) if first_part is not None else None
+    if second_part is None:
+        return await upload_file(
+            filename=filename,
+            body=first_part or b"",
+            content_type=content_type,
+            acl=acl,
+        )
+
+    async def _all_parts():
+        yield first_part
+        yield second_part
+        async for part in parts:
+            yield part
+
+    client = await get_client()
+    response = await client.create_multipart_upload(
+        Bucket=settings.aws_s3_bucket,
+        Key=filename,
+        ACL=acl,
+        ContentType=content_type,
+    )
+    upload_id = response["UploadId"]
+    semaphore = asyncio.Semaphore(settings.aws_s3_upload_concurrency)
+    try:
+        async with asyncio.TaskGroup() as task_group:
+            tasks: list[asyncio.Task] = []
+            part_number = 0
+            async for body in _all_parts():
+                part_number += 1
+                await semaphore.acquire()
+                tasks.append(
+                    task_group.create_task(
+                        _upload_part(
+                            filename=filename,
+                            upload_id=upload_id,
+                            part_number=part_number,
+                            body=body,
+                            semaphore=semaphore,
+                        )
+                    )
+                )
+        return await client.complete_multipart_upload(
+            Bucket=settings.aws_s3_bucket,
+            Key=filename,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": [task.result() for task in tasks]},
+        )
+    except BaseException as error:
+        await client.abort_multipart_upload(
+            Bucket=settings.aws_s3_bucket, Key=filename, UploadId=upload_id
+        )
+        # Callers handle the error that stopped the upload, not the task
+        # group wrapping it.
+        if isinstance(error, BaseExceptionGroup):
+            raise error.exceptions[0]
+        raise
@@ -0,0 +1,42 @@
+from app.services import pubsub
+from app.settings import settings
+
+HEADERS = {
+    "Cache-Control": "no-cache",
+    # Keeps nginx from buffering the stream.
+    "X-Accel-Buffering": "no",
+}
+
+HEARTBEAT = ": ping\n\n"
+
+
+def format_event(id: str, data: bytes | str):
+    if isinstance(data, bytes):
+        data = data.decode()
+    lines = "".join(f"data: {line}\n" for line in data.splitlines() or [""])
+    return f"id: {id}\n{lines}\n"
+
+
+async def event_stream(channel: str, last_event_id: str | None = None):
+    """
+    Server-Sent Events for a pubsub channel. Events are read from the channel's
+    stream with their stream ids as event ids, so a client reconnecting with
+    Last-Event-ID is first sent whatever it missed. Pubsub messages only wake
+    the stream up. A heartbeat comment is sent when nothing has been sent for
+    sse_heartbeat_interval seconds.
+    """
+
+    async with pubsub.get_subscriber().subscribe([channel]) as subscription:
+        # Subscribed before the cursor is read, so nothing falls in between.
+        if last_event_id and pubsub.STREAM_ID_PATTERN.match(last_event_id):
+            cursor = last_event_id
+        else:
+            cursor = await pubsub.get_stream_cursor(channel)
+        while True:
+            subscription.clear()
+            while events := await pubsub.read_stream(channel, after=cursor):
+                for cursor, data in events:
+                    yield format_event(id=cursor, data=data)
+            message = await subscription.get(timeout=settings.sse_heartbeat_interval)
+            if message is None:
+                yield HEARTBEAT
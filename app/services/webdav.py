@@ -0,0 +1,20 @@
+from collections.abc import AsyncIterable
+from pathlib import Path
+
+from app.services import httpclient
+from app.utils.files import iter_file
+
+
+async def upload_file(
+    url: str,
+    username: str,
+    password: str,
+    source: str | Path | AsyncIterable[bytes],
+):
+    # httpx sends async iterators with chunked transfer encoding, so the file
+    # is never read into memory as a whole.
+    if isinstance(source, (str, Path)):
+        source = iter_file(source)
+    async with httpclient.AsyncClient() as client:
+        response = await client.put(url, content=source, auth=(username, password))
+        response.raise_for_status()
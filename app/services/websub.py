@@ -0,0 +1,106 @@
+import hashlib
+import hmac
+import logging
+import traceback
+from typing import Literal
+from urllib.parse import urlencode
+from xml.etree import ElementTree
+
+from pydantic import BaseModel
+
+from app.services import httpclient
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+YOUTUBE_TOPIC_URL = "https://www.youtube.com/xml/feeds/videos.xml"
+
+NAMESPACES = {
+    "atom": "http://www.w3.org/2005/Atom",
+    "yt": "http://www.youtube.com/xml/schemas/2015",
+}
+
+SIGNATURE_ALGORITHMS = {
+    "sha1": hashlib.sha1,
+    "sha256": hashlib.sha256,
+    "sha384": hashlib.sha384,
+    "sha512": hashlib.sha512,
+}
+
+
+class WebSubEntry(BaseModel):
+    video_id: str
+    channel_id: str
+    published: str | None = None
+    updated: str | None = None
+
+
+def get_topic_url(channel_id: str):
+    return f"{YOUTUBE_TOPIC_URL}?{urlencode({'channel_id': channel_id})}"
+
+
+def get_callback_url(channel_id: str):
+    return f"{settings.websub_callback_url}?{urlencode({'channel_id': channel_id})}"
+
+
+def get_channel_secret(channel_id: str):
+    # Derived per channel so the app secret key never leaves the server.
+    return hmac.new(
+        settings.secret_key.encode(),
+        f"websub:{channel_id}".encode(),
+        hashlib.sha256,
+    ).hexdigest()
+
+
+def sign(channel_id: str, body: bytes, algorithm: str = "sha1"):
+    digest = hmac.new(
+        get_channel_secret(channel_id).encode(),
+        body,
+        SIGNATURE_ALGORITHMS[algorithm],
+    ).hexdigest()
+    return f"{algorithm}={digest}"
+
+
+def verify_signature(channel_id: str, body: bytes, signature: str | None):
+    if not signature:
+        return False
+    algorithm, _, _ = signature.partition("=")
+    if algorithm not in SIGNATURE_ALGORITHMS:
+        return False
+    return hmac.compare_digest(
+        sign(channel_id=channel_id, body=body, algorithm=algorithm), signature
+    )
+
+
+def parse_feed(body: bytes):
+    root = ElementTree.fromstring(body)
+    entries: list[WebSubEntry] = []
+    for entry in root.iterfind("atom:entry", NAMESPACES):
+        try:
+            entries.append(
+                WebSubEntry(
+                    video_id=entry.findtext("yt:videoId", namespaces=NAMESPACES),
+                    channel_id=entry.findtext("yt:channelId", namespaces=NAMESPACES),
+                    published=entry.findtext("atom:published", namespaces=NAMESPACES),
+                    updated=entry.findtext("atom:updated", namespaces=NAMESPACES),
+                )
+            )
+        except ValueError:
+            logger.exception(traceback.format_exc())
+    return entries
+
+
+async def subscribe(
+    channel_id: str, mode: Literal["subscribe", "unsubscribe"] = "subscribe"
+):
+    data = {
+        "hub.callback": get_callback_url(channel_id),
+        "hub.topic": get_topic_url(channel_id),
+        "hub.mode": mode,
+        "hub.verify": "async",
+        "hub.secret": get_channel_secret(channel_id),
+        "hub.lease_seconds": settings.websub_lease_seconds,
+    }
+    async with httpclient.AsyncClient() as client:
+        response = await client.post(settings.websub_hub_url, data=data)
+        response.raise_for_status()
@@ -2,6 +2,8 @@ import asyncio
 
 import yt_dlp
 
+from app.settings import settings
+
 
 async def download_audio_from_video(download_path: str, url: str):
     def _download_audio_from_video():
@@ -16,6 +18,9 @@ async def download_audio_from_video(download_path: str, url: str):
                 }
             ],
             "outtmpl": download_path,
+            "postprocessor_args": {
+                "extractaudio": ["-threads", str(settings.ffmpeg_threads)]
+            },
         }
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             ydl.download(url)
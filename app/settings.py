@@ -1,5 +1,6 @@
 from datetime import timezone as tz
 from enum import Enum
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -20,23 +21,55 @@ class Settings(BaseSettings):
     aws_secret_access_key: str
     aws_s3_artwork_folder: str
     aws_s3_bucket: str
+    aws_s3_endpoint_url: str | None = None
+    aws_s3_addressing_style: Literal["path", "virtual"] = "virtual"
+    aws_s3_max_pool_connections: int = 20
     aws_s3_music_folder: str
+    aws_s3_part_size: int = 8 * 1024 * 1024
+    aws_s3_upload_concurrency: int = 4
+    database_max_overflow: int = 10
+    database_pool_size: int = 5
     env: ENV = ENV.DEVELOPMENT
     fernet_key: str
+    ffmpeg_threads: int = 2
+    google_api_daily_quota: int = 10000
     google_api_key: str
+    google_api_quota_reserve: int = 1000
+    http_connect_timeout: float = 10
+    http_host_max_connections: dict[str, int] = {"youtube.googleapis.com": 20}
+    http_http2: bool = True
+    http_keepalive_expiry: float = 30
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_retries: int = 3
+    http_timeout: float = 30
     invidious_api_url: str
+    music_upload_expiry: int = 60 * 60
+    music_upload_max_size: int = 500 * 1024 * 1024
+    pubsub_debounce_window: float = 0.05
+    pubsub_queue_size: int = 100
+    pubsub_stream_max_length: int = 1000
+    pubsub_stream_ttl: int = 60 * 60 * 24
+    redis_max_connections: int | None = None
     redis_url: str
     secret_key: str
     sendgrid_api_key: str
     smtp2go_api_key: str
+    sse_heartbeat_interval: float = 15
     test_async_database_url: str
+    test_aws_endpoint_url: str | None = None
     test_aws_s3_bucket: str
     test_redis_url: str
     test_webdav_password: str
     test_webdav_url: str
     test_webdav_username: str
     timeout: int = 600
+    transcode_concurrency: int | None = None
     timezone: tz | None = tz.utc
+    websub_callback_url: str | None = None
+    websub_hub_url: str = "https://pubsubhubbub.appspot.com/subscribe"
+    websub_lease_seconds: int = 60 * 60 * 24 * 5
+    youtube_channel_update_concurrency: int = 10
 
 
 settings = Settings()
@@ -47,6 +80,9 @@ if settings.env == ENV.TESTING or settings.env == ENV.DEVELOPMENT:
 
 if settings.env == ENV.TESTING:
     settings.async_database_url = settings.test_async_database_url
+    if settings.test_aws_endpoint_url:
+        settings.aws_s3_endpoint_url = settings.test_aws_endpoint_url
+        settings.aws_s3_addressing_style = "path"
     # settings.redis_url = settings.test_redis_url
 
 if settings.async_database_url.find("sqlite") != -1:
@@ -1,38 +1,147 @@
 import asyncio
+import os
 from contextlib import asynccontextmanager
+from typing import Coroutine
 
 from celery import Celery, Task
 from celery.schedules import crontab
-from redis.asyncio import Redis
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from celery.signals import (
+    celeryd_init,
+    worker_process_init,
+    worker_process_shutdown,
+)
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 
+from app.services import httpclient, pubsub, redisclient, s3
 from app.settings import ENV, settings
 
+_engine: AsyncEngine | None = None
+_session_maker: async_sessionmaker[AsyncSession] | None = None
+_runner: asyncio.Runner | None = None
+
+# CPU bound tasks get their own queue and workers so they can't starve the I/O
+# bound ones, or be starved by them.
+TRANSCODE_QUEUE = "transcode"
+
+
+def init_db_engine():
+    global _engine, _session_maker
+    _engine = create_async_engine(
+        settings.async_database_url,
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+        pool_pre_ping=True,
+    )
+    _session_maker = async_sessionmaker(_engine, expire_on_commit=False)
+
+
+def get_session_maker():
+    if _session_maker is None:
+        init_db_engine()
+    return _session_maker
+
+
+async def dispose_db_engine():
+    global _engine, _session_maker
+    if _engine is not None:
+        await _engine.dispose()
+    _engine = None
+    _session_maker = None
+
+
+def get_runner():
+    # Pooled connections are bound to the loop that opened them, so every task
+    # in a worker process has to run on the same loop.
+    global _runner
+    if _runner is None:
+        _runner = asyncio.Runner()
+    return _runner
+
+
+def close_runner():
+    global _runner
+    if _runner is not None:
+        _runner.close()
+    _runner = None
+
+
+async def _run_and_flush(coroutine: Coroutine):
+    try:
+        return await coroutine
+    finally:
+        # The worker loop only runs while a task does, so messages left waiting
+        # on the debounce timer would be held until the next one. A failed flush
+        # is logged rather than raised over the task's own result or error.
+        await pubsub.flush_publisher()
+
+
+def run_coroutine(coroutine: Coroutine):
+    try:
+        loop = asyncio.get_running_loop()
+        return loop.create_task(coroutine)
+    except RuntimeError:
+        return get_runner().run(_run_and_flush(coroutine))
+
 
 class QueueTask(Task):
     @asynccontextmanager
     async def db_session(self):
-        engine = create_async_engine(settings.async_database_url)
-        sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
-        async with sessionmaker() as session:
+        async with get_session_maker()() as session:
             yield session
-        await engine.dispose()
 
     @asynccontextmanager
     async def redis_client(self):
-        redis_client = Redis.from_url(settings.redis_url)
-        try:
+        async with redisclient.RedisClient() as redis_client:
             yield redis_client
-        finally:
-            await redis_client.aclose()
 
     def __call__(self, *args, **kwargs):
-        try:
-            loop = asyncio.get_running_loop()
-            return loop.create_task(self.run(*args, **kwargs))
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            return loop.run_until_complete(self.run(*args, **kwargs))
+        return run_coroutine(self.run(*args, **kwargs))
+
+
+def get_transcode_concurrency():
+    # Each job runs ffmpeg with ffmpeg_threads threads, so size the pool to keep
+    # the cores busy without oversubscribing them.
+    if settings.transcode_concurrency:
+        return settings.transcode_concurrency
+    return max((os.cpu_count() or 1) // settings.ffmpeg_threads, 1)
+
+
+@celeryd_init.connect
+def init_worker(conf, options, **kwargs):
+    queues = options.get("queues") or []
+    if TRANSCODE_QUEUE in queues and not options.get("concurrency"):
+        conf.worker_concurrency = get_transcode_concurrency()
+
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    redisclient.reset_connection_pool()
+    httpclient.reset_client()
+    s3.reset_client()
+    pubsub.reset_publisher()
+    init_db_engine()
+    close_runner()
+    get_runner()
+
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    async def _shutdown():
+        await pubsub.flush_publisher()
+        await dispose_db_engine()
+        await redisclient.close_connection_pool()
+        await httpclient.close_client()
+        await s3.close_client()
+
+    try:
+        get_runner().run(_shutdown())
+    finally:
+        close_runner()
 
 
 celery = Celery(
@@ -46,6 +155,7 @@ celery.conf.update(
     result_serializer="json",
     result_backend_always_retry=True,
     result_backend_max_retries=3,
+    task_routes={"app.tasks.music.*": {"queue": TRANSCODE_QUEUE}},
 )
 
 
@@ -65,3 +175,7 @@ def setup_periodic_tasks(sender: Celery, **kwargs):
         sender.add_periodic_task(
             crontab.from_string("0 0 * * *"), youtube.update_video_categories.s()
         )
+        sender.add_periodic_task(
+            crontab.from_string("15 */6 * * *"),
+            youtube.renew_websub_subscriptions.s(),
+        )
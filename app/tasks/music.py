@@ -1,4 +1,5 @@
-import asyncio
+from collections.abc import AsyncIterable
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from pathlib import Path
 
@@ -10,7 +11,6 @@ from yt_dlp.utils import sanitize_filename
 from app.db import MusicJob, WebDav
 from app.models.music import MusicJobUpdateResponse
 from app.services import (
-    audiotags,
     ffmpeg,
     httpclient,
     imagedownloader,
@@ -18,30 +18,43 @@ from app.services import (
     tempfiles,
     ytdlp,
 )
+from app.services import webdav as webdav_service
 from app.services.pubsub import PubSub
 from app.settings import settings
-from app.tasks.app import QueueTask, celery
+from app.tasks.app import QueueTask, celery, run_coroutine
 
 JOB_DIR = "music_jobs"
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
 
 
-async def retrieve_audio_file(music_job: MusicJob):
+async def create_job_directory(music_job: MusicJob):
     jobs_root_directory = await tempfiles.create_new_directory(JOB_DIR)
     job_file_path = Path(jobs_root_directory).joinpath(str(music_job.id))
     await aiofiles.os.mkdir(job_file_path)
+    return job_file_path
 
-    filename = None
-    if music_job.filename_url:
-        async with httpclient.AsyncClient() as client:
-            response = await client.get(music_job.filename_url)
-            audio_file_path = job_file_path.joinpath(
-                f"temp{Path(music_job.original_filename).suffix}"
-            )
 
-            async with aiofiles.open(audio_file_path, mode="wb") as f:
-                await f.write(response.content)
+@asynccontextmanager
+async def open_audio_source(music_job: MusicJob, job_file_path: Path):
+    """
+    Yield the job's audio for ffmpeg along with whether it is already an mp3.
+    Uploaded files are streamed from the bucket unless ffmpeg needs to seek in
+    them, in which case they are downloaded first.
+    """
 
-            filename = await ffmpeg.convert_audio_to_mp3(audio_file=audio_file_path)
+    if music_job.filename_url:
+        suffix = Path(music_job.original_filename).suffix.lower()
+        async with httpclient.AsyncClient() as client:
+            async with client.stream("GET", music_job.filename_url) as response:
+                response.raise_for_status()
+                source = response.aiter_bytes(chunk_size=DOWNLOAD_CHUNK_SIZE)
+                if not ffmpeg.can_convert_stream(music_job.original_filename):
+                    audio_file_path = job_file_path.joinpath(f"temp{suffix}")
+                    async with aiofiles.open(audio_file_path, mode="wb") as f:
+                        async for chunk in source:
+                            await f.write(chunk)
+                    source = audio_file_path
+                yield source, suffix == ".mp3"
     elif music_job.video_url:
         # NOTE: Invidious doesn't work atm
         # if "youtube.com" in music_job.video_url:
@@ -50,31 +63,43 @@ async def retrieve_audio_file(music_job: MusicJob):
         #     await invidious.download_audio_from_youtube_video(
         #         video_id=video_id, download_path=audio_file_path
         #     )
-        #     filename = await ffmpeg.convert_audio_to_mp3(audio_file=audio_file_path)
         # else:
         filename = str(Path(job_file_path).joinpath("temp.mp3"))
         await ytdlp.download_audio_from_video(
             url=music_job.video_url, download_path=filename.replace(".mp3", "")
         )
-    return filename
+        yield filename, True
+    else:
+        raise Exception("File not found")
 
 
-def update_audio_tags(
-    music_job: MusicJob,
-    filename: str,
-    artwork_info: imagedownloader.RetrievedArtwork,
+async def write_artwork_file(
+    artwork_info: imagedownloader.RetrievedArtwork | None, job_file_path: Path
 ):
-    audio_tag_service = audiotags.AudioTags(file_path=filename)
-    audio_tag_service.title = music_job.title
-    audio_tag_service.artist = music_job.artist
-    audio_tag_service.album = music_job.album
+    if not artwork_info:
+        return None
+    artwork_file_path = job_file_path.joinpath(f"artwork.{artwork_info.extension}")
+    async with aiofiles.open(artwork_file_path, mode="wb") as f:
+        await f.write(artwork_info.image)
+    return artwork_file_path
+
+
+def get_audio_metadata(music_job: MusicJob):
+    metadata = {
+        "title": music_job.title,
+        "artist": music_job.artist,
+        "album": music_job.album,
+    }
     if music_job.grouping:
-        audio_tag_service.grouping = music_job.grouping
-    if artwork_info:
-        audio_tag_service.set_artwork(
-            data=artwork_info.image,
-            mime_type=f"image/{artwork_info.extension}",
-        )
+        metadata["grouping"] = music_job.grouping
+    return metadata
+
+
+async def tee_to_file(source: AsyncIterable[bytes], path: Path):
+    async with aiofiles.open(path, mode="wb") as f:
+        async for chunk in source:
+            await f.write(chunk)
+            yield chunk
 
 
 async def get_artwork_info(music_job: MusicJob):
@@ -84,11 +109,21 @@ async def get_artwork_info(music_job: MusicJob):
         return None
 
 
+def get_music_job_pubsub(music_job: MusicJob):
+    return PubSub(
+        channels=[
+            PubSub.Channels.for_user(
+                PubSub.Channels.MUSIC_JOB_UPDATE, email=music_job.user_email
+            )
+        ]
+    )
+
+
 async def on_failed_music_job(self: QueueTask, exc, task_id, args, kwargs, einfo):
     music_job_id = kwargs.get("music_job_id")
-    pubsub = PubSub(channels=[PubSub.Channels.MUSIC_JOB_UPDATE])
     async with self.db_session() as db_session:
         music_job = await db_session.get_one(MusicJob, music_job_id)
+        pubsub = get_music_job_pubsub(music_job=music_job)
         music_job.failed = datetime.now(timezone.utc)
         await db_session.commit()
         await pubsub.publish_message(
@@ -100,28 +135,22 @@ async def on_failed_music_job(self: QueueTask, exc, task_id, args, kwargs, einfo
 
 @celery.task(
     bind=True,
-    on_failure=lambda *args, **kwargs: asyncio.run(
+    on_failure=lambda *args, **kwargs: run_coroutine(
         on_failed_music_job(*args, **kwargs)
     ),
 )
 async def run_music_job(self: QueueTask, music_job_id: str):
-    pubsub = PubSub(channels=[PubSub.Channels.MUSIC_JOB_UPDATE])
     async with self.db_session() as db_session:
         music_job = await db_session.get_one(MusicJob, music_job_id)
+        pubsub = get_music_job_pubsub(music_job=music_job)
         await pubsub.publish_message(
             MusicJobUpdateResponse(id=music_job_id, status="STARTED").model_dump_json()
         )
 
-        if not (filename := await retrieve_audio_file(music_job=music_job)):
-            raise Exception("File not found")
-
+        job_file_path = await create_job_directory(music_job=music_job)
         artwork_info = await get_artwork_info(music_job=music_job)
-
-        await asyncio.to_thread(
-            update_audio_tags,
-            music_job=music_job,
-            filename=filename,
-            artwork_info=artwork_info,
+        artwork_file_path = await write_artwork_file(
+            artwork_info=artwork_info, job_file_path=job_file_path
         )
 
         new_filename = "{title} {artist}.mp3".format(
@@ -137,21 +166,30 @@ async def run_music_job(self: QueueTask, music_job_id: str):
         query = select(WebDav).where(WebDav.email == music_job.user_email)
         webdav = await db_session.scalar(query)
 
-        async with aiofiles.open(filename, mode="rb") as f:
-            file_content = await f.read()
-            await s3.upload_file(
-                filename=new_filepath,
-                body=file_content,
-                content_type="audio/mpeg",
+        # The download, transcode, tagging and upload all run as one stream.
+        # The output only touches the disk when it also has to go to WebDAV.
+        async with open_audio_source(
+            music_job=music_job, job_file_path=job_file_path
+        ) as (source, is_mp3):
+            output = ffmpeg.transcode_to_mp3(
+                source=source,
+                metadata=get_audio_metadata(music_job=music_job),
+                artwork_file=artwork_file_path,
+                copy_audio=is_mp3,
             )
             if webdav:
-                async with httpclient.AsyncClient() as client:
-                    response = await client.put(
-                        f"{webdav.url}/{new_filename}",
-                        content=file_content,
-                        auth=(webdav.username, webdav.password),
-                    )
-                    response.raise_for_status()
+                output_file_path = job_file_path.joinpath(new_filename)
+                output = tee_to_file(source=output, path=output_file_path)
+            await s3.upload_stream(
+                filename=new_filepath, source=output, content_type="audio/mpeg"
+            )
+        if webdav:
+            await webdav_service.upload_file(
+                url=f"{webdav.url}/{new_filename}",
+                username=webdav.username,
+                password=webdav.password,
+                source=output_file_path,
+            )
 
         music_job.download_filename = new_filepath
         music_job.download_url = s3.resolve_url(filename=new_filepath)
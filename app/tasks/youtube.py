@@ -1,24 +1,41 @@
 import asyncio
+import json
+import logging
 from datetime import date, datetime, timedelta, timezone
 
 import dateutil.parser
-from sqlalchemy import and_, delete, false, select
-from sqlalchemy.orm import joinedload
+from celery import group
+from sqlalchemy import Date, case, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import (
     User,
     YoutubeChannel,
-    YoutubeNewSubscription,
     YoutubeSubscription,
     YoutubeUserChannel,
+    YoutubeUserFeed,
     YoutubeVideo,
     YoutubeVideoCategory,
 )
 from app.models.youtube import YoutubeChannelUpdateResponse
-from app.services import google
+from app.services import google, locks, quota, websub
 from app.services.pubsub import PubSub
+from app.settings import settings
 from app.tasks.app import QueueTask, celery
 
+logger = logging.getLogger(__name__)
+
+# Matches the hourly update_channel_videos schedule in setup_periodic_tasks.
+CHANNEL_SWEEP_INTERVAL = timedelta(hours=1)
+CHANNEL_ACTIVITY_WINDOW = timedelta(days=30)
+WEBSUB_RENEWAL_MARGIN = timedelta(days=1)
+CHANNEL_UPDATES_SEMAPHORE = "youtube:channel_updates"
+CHANNEL_UPDATE_RETRY_COUNTDOWN = 30
+CHANNEL_UPDATE_MAX_RETRIES = 20
+CHANNEL_UPDATE_SLOT_SECONDS = 5
+CHANNEL_UPDATE_FLIGHT_PREFIX = "youtube:channel_update"
+
 
 @celery.task(bind=True)
 async def update_user_subscriptions(self: QueueTask, email: str):
@@ -27,171 +44,506 @@ async def update_user_subscriptions(self: QueueTask, email: str):
         if not (user_channel := await db_session.scalar(query)):
             return
 
+        query = select(YoutubeSubscription).where(YoutubeSubscription.email == email)
+        existing_subscriptions = {
+            subscription.channel_id: subscription
+            for subscription in await db_session.scalars(query)
+        }
+        subscribed_channel_ids: set[str] = set()
+
         async for subscribed_channels in google.get_channel_subscriptions(
             channel_id=user_channel.id
         ):
-            for subscribed_channel in subscribed_channels:
-                query = select(YoutubeChannel).where(
-                    YoutubeChannel.id == subscribed_channel.id
-                )
-                if channel := await db_session.scalar(query):
-                    channel.title = subscribed_channel.title
-                    channel.thumbnail = subscribed_channel.thumbnail
-                else:
-                    channel = YoutubeChannel(
-                        id=subscribed_channel.id,
-                        title=subscribed_channel.title,
-                        thumbnail=subscribed_channel.thumbnail,
-                        last_videos_updated=datetime.now(timezone.utc),
-                    )
-                    db_session.add(channel)
-                    await db_session.commit()
-                    await asyncio.to_thread(
-                        add_channel_videos.delay, channel_id=channel.id
+            channels = {channel.id: channel for channel in subscribed_channels}
+            if not channels:
+                continue
+            subscribed_channel_ids.update(channels.keys())
+            current_time = datetime.now(timezone.utc)
+
+            query = select(YoutubeChannel.id).where(YoutubeChannel.id.in_(channels))
+            existing_channel_ids = set(await db_session.scalars(query))
+
+            query = insert(YoutubeChannel).values(
+                [
+                    {
+                        "id": channel.id,
+                        "title": channel.title,
+                        "thumbnail": channel.thumbnail,
+                        "last_videos_updated": current_time,
+                    }
+                    for channel in channels.values()
+                ]
+            )
+            query = query.on_conflict_do_update(
+                index_elements=[YoutubeChannel.id],
+                set_={
+                    "title": query.excluded.title,
+                    "thumbnail": query.excluded.thumbnail,
+                    "modified_at": current_time,
+                },
+            )
+            await db_session.execute(query)
+
+            if new_channel_ids := [
+                channel_id
+                for channel_id in channels
+                if channel_id not in existing_subscriptions
+            ]:
+                query = (
+                    insert(YoutubeSubscription)
+                    .values(
+                        [
+                            {"email": email, "channel_id": channel_id}
+                            for channel_id in new_channel_ids
+                        ]
                     )
-                query = select(YoutubeSubscription).where(
-                    YoutubeSubscription.channel_id == channel.id,
-                    YoutubeSubscription.email == email,
+                    .on_conflict_do_nothing()
+                )
+                await db_session.execute(query)
+                await db_session.execute(
+                    YoutubeUserFeed.backfill(email=email, channel_ids=new_channel_ids)
                 )
-                if not (subscription := await db_session.scalar(query)):
-                    db_session.add(
-                        YoutubeSubscription(email=email, channel_id=channel.id)
-                    )
-                else:
-                    if not subscription.user_submitted:
-                        subscription.deleted_at = None
 
-                query = select(YoutubeNewSubscription).where(
-                    YoutubeNewSubscription.channel_id == subscribed_channel.id,
-                    YoutubeNewSubscription.email == email,
+            if reactivated_channel_ids := [
+                channel_id
+                for channel_id in channels
+                if (subscription := existing_subscriptions.get(channel_id))
+                and subscription.deleted_at is not None
+                and not subscription.user_submitted
+            ]:
+                query = (
+                    update(YoutubeSubscription)
+                    .where(
+                        YoutubeSubscription.email == email,
+                        YoutubeSubscription.channel_id.in_(reactivated_channel_ids),
+                    )
+                    .values(deleted_at=None)
                 )
-                new_subscription = await db_session.scalar(query)
-                if not new_subscription:
-                    db_session.add(
-                        YoutubeNewSubscription(
-                            channel_id=subscribed_channel.id, email=email
-                        )
+                await db_session.execute(query)
+                await db_session.execute(
+                    YoutubeUserFeed.backfill(
+                        email=email, channel_ids=reactivated_channel_ids
                     )
-                await db_session.commit()
+                )
+            await db_session.commit()
 
-        query = (
-            select(YoutubeSubscription)
-            .join(
-                YoutubeNewSubscription,
-                and_(
-                    YoutubeNewSubscription.channel_id == YoutubeSubscription.channel_id,
-                    YoutubeNewSubscription.email == YoutubeSubscription.email,
-                ),
-                isouter=True,
+            for channel_id in channels.keys() - existing_channel_ids:
+                await asyncio.to_thread(add_channel_videos.delay, channel_id=channel_id)
+
+        if removed_channel_ids := [
+            channel_id
+            for channel_id, subscription in existing_subscriptions.items()
+            if subscription.deleted_at is None
+            and not subscription.user_submitted
+            and channel_id not in subscribed_channel_ids
+        ]:
+            query = (
+                update(YoutubeSubscription)
+                .where(
+                    YoutubeSubscription.email == email,
+                    YoutubeSubscription.channel_id.in_(removed_channel_ids),
+                )
+                .values(deleted_at=datetime.now(timezone.utc))
             )
-            .where(
-                YoutubeSubscription.email == user_channel.email,
-                YoutubeSubscription.deleted_at.is_(None),
-                YoutubeSubscription.user_submitted == false(),
-                YoutubeNewSubscription.channel_id.is_(None),
+            await db_session.execute(query)
+            await db_session.execute(
+                YoutubeUserFeed.prune(email=email, channel_ids=removed_channel_ids)
             )
+            await db_session.commit()
+
+
+async def upsert_channel_videos(
+    db_session: AsyncSession, channel_id: str, videos: list[google.YoutubeVideoInfo]
+):
+    if not videos:
+        return
+    # Keyed by id since ON CONFLICT DO UPDATE cannot touch the same row twice
+    # within a single statement.
+    values = {
+        video.id: {
+            "id": video.id,
+            "title": video.title,
+            "thumbnail": video.thumbnail,
+            "channel_id": channel_id,
+            "category_id": video.category_id,
+            "description": video.description,
+            "published_at": dateutil.parser.parse(video.published),
+        }
+        for video in videos
+    }
+    query = insert(YoutubeVideo).values(list(values.values()))
+    query = query.on_conflict_do_update(
+        index_elements=[YoutubeVideo.id],
+        set_={
+            "title": query.excluded.title,
+            "thumbnail": query.excluded.thumbnail,
+            "description": query.excluded.description,
+            "published_at": case(
+                (
+                    or_(
+                        YoutubeVideo.title != query.excluded.title,
+                        YoutubeVideo.thumbnail != query.excluded.thumbnail,
+                    ),
+                    query.excluded.published_at,
+                ),
+                else_=YoutubeVideo.published_at,
+            ),
+            "modified_at": datetime.now(timezone.utc),
+        },
+    )
+    await db_session.execute(query)
+    await db_session.execute(YoutubeUserFeed.fan_out(video_ids=list(values.keys())))
+
+
+def _videos_after(videos: list[google.YoutubeVideoInfo], date_after: date | None):
+    """
+    Return the videos published on or after date_after, along with whether the
+    cut off was crossed. Videos are expected newest first.
+    """
+    for i, video in enumerate(videos):
+        video_upload_date = dateutil.parser.parse(video.published)
+        if date_after and video_upload_date.date() < date_after:
+            return videos[:i], True
+    return videos, False
+
+
+async def _extend_channel_update(
+    flight: locks.SingleFlight, semaphore: locks.Semaphore
+):
+    # A long scan keeps both its channel and its concurrency slot, otherwise
+    # another worker could take the slot and run over the limit.
+    await flight.extend()
+    await semaphore.extend()
+
+
+async def _sync_channel_videos(
+    db_session: AsyncSession,
+    channel: YoutubeChannel,
+    date_after: date | None,
+    flight: locks.SingleFlight,
+    semaphore: locks.Semaphore,
+):
+    async for videos in google.get_channel_latest_videos(channel_id=channel.id):
+        page_videos, end_update = _videos_after(videos=videos, date_after=date_after)
+        await upsert_channel_videos(
+            db_session=db_session, channel_id=channel.id, videos=page_videos
         )
-        subscriptions = await db_session.scalars(query)
-        for subscription in subscriptions:
-            await db_session.delete(subscription)
-        query = delete(YoutubeNewSubscription).where(
-            YoutubeNewSubscription.email == email
+        await db_session.commit()
+        await _extend_channel_update(flight=flight, semaphore=semaphore)
+        if end_update:
+            break
+
+
+async def _sync_channel_videos_incremental(
+    db_session: AsyncSession,
+    channel: YoutubeChannel,
+    date_after: date | None,
+    flight: locks.SingleFlight,
+    semaphore: locks.Semaphore,
+):
+    if not channel.uploads_playlist_id:
+        channel.uploads_playlist_id = await google.get_channel_upload_playlist_id(
+            channel_id=channel.id
         )
-        await db_session.execute(query)
         await db_session.commit()
 
+    async for video_ids in google.get_playlist_video_ids(
+        playlist_id=channel.uploads_playlist_id
+    ):
+        query = select(YoutubeVideo.id).where(YoutubeVideo.id.in_(video_ids))
+        known_video_ids = set(await db_session.scalars(query))
+        unseen_video_ids = [
+            video_id for video_id in video_ids if video_id not in known_video_ids
+        ]
+        # The uploads playlist is newest first, so once a whole page is already
+        # stored everything after it is too.
+        if not unseen_video_ids:
+            break
+        videos = await google.get_videos_info(video_ids=unseen_video_ids)
+        page_videos, end_update = _videos_after(videos=videos, date_after=date_after)
+        await upsert_channel_videos(
+            db_session=db_session, channel_id=channel.id, videos=page_videos
+        )
+        await db_session.commit()
+        await _extend_channel_update(flight=flight, semaphore=semaphore)
+        if end_update:
+            break
+
+
+def channel_update_flight(channel_id: str):
+    return locks.SingleFlight(
+        name=f"{CHANNEL_UPDATE_FLIGHT_PREFIX}:{channel_id}", timeout=settings.timeout
+    )
+
+
+async def get_updating_channel_ids(channel_ids: list[str]):
+    names = {
+        f"{CHANNEL_UPDATE_FLIGHT_PREFIX}:{channel_id}": channel_id
+        for channel_id in channel_ids
+    }
+    return {names[name] for name in await locks.SingleFlight.held(list(names))}
+
+
+def _merge_channel_update_requests(requests: list[str]):
+    """
+    Collapse the updates requested while a channel was already updating into
+    one that covers all of them: the earliest date after (none if any asked
+    for everything) and a full scan if any asked for one.
+    """
+
+    requests = [json.loads(request) for request in requests]
+    date_afters = [request["date_after"] for request in requests]
+    return {
+        "date_after": (
+            None
+            if None in date_afters
+            else min(date.fromisoformat(date_after) for date_after in date_afters)
+        ),
+        "incremental": all(request["incremental"] for request in requests),
+    }
+
+
+def get_channel_update_key(channel_id: str):
+    return f"{PubSub.Channels.YOUTUBE_CHANNEL_UPDATE}:{channel_id}"
+
+
+async def get_channel_update_pubsub(db_session: AsyncSession, channel_id: str):
+    # Resolved once per update so listeners need no lookups per message.
+    query = select(YoutubeSubscription.email).where(
+        YoutubeSubscription.channel_id == channel_id,
+        YoutubeSubscription.deleted_at.is_(None),
+    )
+    emails = (await db_session.scalars(query)).all()
+    return PubSub(
+        channels=[
+            PubSub.Channels.for_user(
+                PubSub.Channels.YOUTUBE_CHANNEL_UPDATE, email=email
+            )
+            for email in emails
+        ]
+    )
+
 
 @celery.task(bind=True)
 async def add_channel_videos(
     self: QueueTask,
     channel_id: str,
     date_after: date | None = None,
+    incremental: bool = False,
 ):
-    pubsub = PubSub(channels=[PubSub.Channels.YOUTUBE_CHANNEL_UPDATE])
+    pubsub = PubSub(channels=[])
 
-    async with self.db_session() as db_session:
-        query = select(YoutubeChannel).where(YoutubeChannel.id == channel_id)
-        channel = await db_session.scalar(query)
-        if not channel:
-            raise Exception(f"Channel ({channel_id}) not found")
-
-        channel.updating = True
-        await db_session.commit()
+    # Caps how many channel updates run at once across all workers, whichever
+    # way they were dispatched.
+    semaphore = locks.Semaphore(
+        name=CHANNEL_UPDATES_SEMAPHORE,
+        limit=settings.youtube_channel_update_concurrency,
+        timeout=settings.timeout,
+    )
+    if not await semaphore.acquire():
+        # Bounded so a backlog can't keep workers busy retrying forever. A
+        # channel given up on is still stale and comes first in the next sweep.
+        raise self.retry(
+            countdown=CHANNEL_UPDATE_RETRY_COUNTDOWN,
+            max_retries=CHANNEL_UPDATE_MAX_RETRIES,
+        )
 
-        await pubsub.publish_message(
-            message=YoutubeChannelUpdateResponse(
-                id=channel.id, updating=True
-            ).model_dump_json()
+    try:
+        flight = channel_update_flight(channel_id)
+        request = json.dumps(
+            {
+                "date_after": date_after.isoformat() if date_after else None,
+                "incremental": incremental,
+            }
         )
+        if not await flight.acquire(request=request):
+            return
+
+        try:
+            async with self.db_session() as db_session:
+                query = select(YoutubeChannel).where(YoutubeChannel.id == channel_id)
+                channel = await db_session.scalar(query)
+                if not channel:
+                    raise Exception(f"Channel ({channel_id}) not found")
 
-        async for videos in google.get_channel_latest_videos(channel_id=channel_id):
-            end_update = False
-            for video in videos:
-                video_upload_date = dateutil.parser.parse(video.published)
-                if date_after and video_upload_date.date() < date_after:
-                    end_update = True
-                    break
-
-                query = select(YoutubeVideo).where(YoutubeVideo.id == video.id)
-                existing_video = await db_session.scalar(query)
-
-                if existing_video:
-                    if [existing_video.title, existing_video.thumbnail] != [
-                        video.title,
-                        video.thumbnail,
-                    ]:
-                        existing_video.published_at = video_upload_date
-                    existing_video.title = video.title
-                    existing_video.thumbnail = video.thumbnail
-                    existing_video.description = video.description
+                pubsub = await get_channel_update_pubsub(
+                    db_session=db_session, channel_id=channel.id
+                )
+                await pubsub.publish_message(
+                    message=YoutubeChannelUpdateResponse(
+                        id=channel.id, updating=True
+                    ).model_dump_json(),
+                    key=get_channel_update_key(channel.id),
+                )
+
+                if incremental:
+                    await _sync_channel_videos_incremental(
+                        db_session=db_session,
+                        channel=channel,
+                        date_after=date_after,
+                        flight=flight,
+                        semaphore=semaphore,
+                    )
                 else:
-                    db_session.add(
-                        YoutubeVideo(
-                            id=video.id,
-                            title=video.title,
-                            thumbnail=video.thumbnail,
-                            channel_id=channel_id,
-                            category_id=video.category_id,
-                            description=video.description,
-                            published_at=video_upload_date,
-                        )
+                    await _sync_channel_videos(
+                        db_session=db_session,
+                        channel=channel,
+                        date_after=date_after,
+                        flight=flight,
+                        semaphore=semaphore,
                     )
+
+                channel.last_videos_updated = datetime.now(timezone.utc)
                 await db_session.commit()
-            if end_update:
-                break
+        finally:
+            pending_requests = await flight.release()
+            await pubsub.publish_message(
+                message=YoutubeChannelUpdateResponse(
+                    id=channel_id, updating=False
+                ).model_dump_json(),
+                key=get_channel_update_key(channel_id),
+            )
+            if pending_requests:
+                await asyncio.to_thread(
+                    add_channel_videos.delay,
+                    channel_id=channel_id,
+                    **_merge_channel_update_requests(pending_requests),
+                )
+    finally:
+        await semaphore.release()
 
-        await pubsub.publish_message(
-            message=YoutubeChannelUpdateResponse(
-                id=channel.id, updating=False
-            ).model_dump_json()
+
+@celery.task(bind=True)
+async def add_channel_video(self: QueueTask, channel_id: str, video_id: str):
+    async with self.db_session() as db_session:
+        if not await db_session.get(YoutubeChannel, channel_id):
+            return
+        videos = await google.get_videos_info(video_ids=[video_id])
+        await upsert_channel_videos(
+            db_session=db_session, channel_id=channel_id, videos=videos
         )
-        channel.updating = False
-        channel.last_videos_updated = datetime.now(timezone.utc)
         await db_session.commit()
 
 
 @celery.task(bind=True)
-async def update_channel_videos(self: QueueTask, date_after: date | None = None):
+async def renew_websub_subscriptions(self: QueueTask):
+    if not settings.websub_callback_url:
+        return
+    renew_before = datetime.now(timezone.utc) + WEBSUB_RENEWAL_MARGIN
+    subscribed_channel_ids = select(YoutubeSubscription.channel_id).where(
+        YoutubeSubscription.deleted_at.is_(None)
+    )
     async with self.db_session() as db_session:
-        query = (
-            select(YoutubeSubscription)
-            .where(YoutubeSubscription.deleted_at.is_(None))
-            .distinct(YoutubeSubscription.channel_id)
-            .options(joinedload(YoutubeSubscription.channel))
+        query = select(YoutubeChannel.id).where(
+            YoutubeChannel.id.in_(subscribed_channel_ids),
+            or_(
+                YoutubeChannel.websub_lease_expires.is_(None),
+                YoutubeChannel.websub_lease_expires < renew_before,
+            ),
         )
-        stream = await db_session.stream_scalars(query)
-        async for subscription in stream:
-            channel = subscription.channel
-            if not date_after:
-                date_after = min(
-                    datetime.now(timezone.utc) - timedelta(days=1),
-                    channel.last_videos_updated,
-                ).date()
-            await asyncio.to_thread(
-                add_channel_videos.delay,
-                channel_id=subscription.channel_id,
-                date_after=date_after,
+        renew_channel_ids = (await db_session.scalars(query)).all()
+        query = select(YoutubeChannel.id).where(
+            YoutubeChannel.id.not_in(subscribed_channel_ids),
+            YoutubeChannel.websub_lease_expires.is_not(None),
+        )
+        stale_channel_ids = (await db_session.scalars(query)).all()
+    # The hub confirms each request against the callback, which is where the
+    # lease expiry gets recorded. A failed request is left for the next run
+    # rather than holding up every channel after it until then.
+    hub_requests = [
+        *[(channel_id, "subscribe") for channel_id in renew_channel_ids],
+        *[(channel_id, "unsubscribe") for channel_id in stale_channel_ids],
+    ]
+    for channel_id, mode in hub_requests:
+        try:
+            await websub.subscribe(channel_id=channel_id, mode=mode)
+        except Exception:
+            logger.exception("Failed to %s channel (%s) with the hub", mode, channel_id)
+
+
+@celery.task(bind=True)
+async def update_channel_videos(self: QueueTask, date_after: date | None = None):
+    budget = await quota.get_sweep_budget(sweep_interval=CHANNEL_SWEEP_INTERVAL)
+    now = func.now()
+    recent_uploads = (
+        select(
+            YoutubeVideo.channel_id,
+            func.count(YoutubeVideo.id).label("uploads"),
+        )
+        .where(YoutubeVideo.published_at >= now - CHANNEL_ACTIVITY_WINDOW)
+        .group_by(YoutubeVideo.channel_id)
+        .subquery()
+    )
+    # Expected uploads since the last update: the smoothed upload rate over the
+    # activity window times the days the channel has been stale, so channels
+    # without recent uploads still rise in priority as they go stale.
+    upload_rate = (func.coalesce(recent_uploads.c.uploads, 0) + 1) / float(
+        CHANNEL_ACTIVITY_WINDOW.days
+    )
+    stale_days = func.extract("epoch", now - YoutubeChannel.last_videos_updated) / (
+        60 * 60 * 24
+    )
+    # One playlistItems page and one videos lookup, plus the channels lookup
+    # the first time the uploads playlist id has to be resolved.
+    cost = (
+        quota.ENDPOINT_COSTS["/youtube/v3/playlistItems"]
+        + quota.ENDPOINT_COSTS["/youtube/v3/videos"]
+    )
+    query = (
+        select(
+            YoutubeChannel.id,
+            func.timezone(
+                "UTC",
+                func.least(now - timedelta(days=1), YoutubeChannel.last_videos_updated),
+            ).cast(Date),
+            case(
+                (
+                    YoutubeChannel.uploads_playlist_id.is_(None),
+                    cost + quota.ENDPOINT_COSTS["/youtube/v3/channels"],
+                ),
+                else_=cost,
+            ),
+        )
+        .outerjoin(recent_uploads, recent_uploads.c.channel_id == YoutubeChannel.id)
+        .where(
+            YoutubeChannel.id.in_(
+                select(YoutubeSubscription.channel_id).where(
+                    YoutubeSubscription.deleted_at.is_(None)
+                )
             )
+        )
+        .order_by((upload_rate * func.greatest(stale_days, 0)).desc())
+    )
+    async with self.db_session() as db_session:
+        channels = (await db_session.execute(query)).all()
+
+    spent = 0
+    signatures = []
+    for channel_id, channel_date_after, channel_cost in channels:
+        if spent + channel_cost > budget:
+            break
+        spent += channel_cost
+        # Staggered in batches of the semaphore limit, so the sweep mostly
+        # arrives as slots free up instead of piling onto the semaphore at once.
+        slot = len(signatures) // settings.youtube_channel_update_concurrency
+        signatures.append(
+            add_channel_videos.s(
+                channel_id=channel_id,
+                date_after=date_after or channel_date_after,
+                incremental=True,
+            ).set(countdown=slot * CHANNEL_UPDATE_SLOT_SECONDS)
+        )
+    # A group publishes every message over one producer connection instead of
+    # a broker round trip per channel.
+    if signatures:
+        await asyncio.to_thread(group(signatures).apply_async)
+    logger.info(
+        "Scheduled %d of %d channels for %d of %d budgeted quota units",
+        len(signatures),
+        len(channels),
+        spent,
+        budget,
+    )
 
 
 @celery.task(bind=True)
@@ -1,9 +1,14 @@
+import base64
+import binascii
+import json
 import math
 from dataclasses import dataclass
-from typing import Generic, TypeVar
+from datetime import datetime
+from typing import Generic, Literal, TypeVar
 
-from sqlalchemy import Select, func, select
+from sqlalchemy import ColumnElement, Select, UnaryExpression, and_, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import operators
 
 T = TypeVar("T")
 
@@ -14,6 +19,13 @@ class PaginatedResults(Generic[T]):
     total_pages: int
 
 
+@dataclass
+class CursorResults(Generic[T]):
+    results: list[T]
+    next_cursor: str | None
+    prev_cursor: str | None
+
+
 async def query_with_pagination(
     db_session: AsyncSession, query: Select[T], page: int, per_page: int
 ):
@@ -25,3 +37,125 @@ async def query_with_pagination(
     total_pages = math.ceil(count / per_page)
 
     return PaginatedResults[T](results=items, total_pages=total_pages)
+
+
+def _encode_cursor(direction: Literal["next", "prev"], values: list):
+    encoded_values = [
+        {"datetime": value.isoformat()} if isinstance(value, datetime) else value
+        for value in values
+    ]
+    payload = json.dumps({"direction": direction, "values": encoded_values})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def _is_cursor_value_valid(column: ColumnElement, value):
+    # Anything the column can't be compared with would only fail in the
+    # database, so tampered or stale cursors are rejected here.
+    if value is None:
+        return True
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return True
+    if isinstance(value, bool) and python_type is not bool:
+        return False
+    if not isinstance(value, python_type):
+        return False
+    if isinstance(value, datetime) and getattr(column.type, "timezone", False):
+        return value.tzinfo is not None
+    return True
+
+
+def _decode_cursor(cursor: str, columns: list[ColumnElement]):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        direction = payload["direction"]
+        values = [
+            datetime.fromisoformat(value["datetime"])
+            if isinstance(value, dict)
+            else value
+            for value in payload["values"]
+        ]
+    except (binascii.Error, json.JSONDecodeError, KeyError, TypeError, ValueError):
+        raise ValueError("Invalid cursor.")
+    if direction not in ["next", "prev"] or len(values) != len(columns):
+        raise ValueError("Invalid cursor.")
+    if not all(
+        _is_cursor_value_valid(column, value) for column, value in zip(columns, values)
+    ):
+        raise ValueError("Invalid cursor.")
+    return direction, values
+
+
+def _keyset_filter(
+    columns: list[tuple[ColumnElement, bool]], values: list, backwards: bool
+):
+    clauses = []
+    for i, (column, descending) in enumerate(columns):
+        value = values[i]
+        comparison = column < value if descending != backwards else column > value
+        clauses.append(
+            and_(
+                *[
+                    previous_column == previous_value
+                    for (previous_column, _), previous_value in zip(
+                        columns[:i], values[:i]
+                    )
+                ],
+                comparison,
+            )
+        )
+    return or_(*clauses)
+
+
+async def query_with_cursor(
+    db_session: AsyncSession,
+    query: Select[T],
+    order_by: list[UnaryExpression],
+    per_page: int,
+    cursor: str | None = None,
+):
+    # The ordering has to end with a unique column (e.g. the primary key) so
+    # every row has a distinct position to resume from.
+    columns = [
+        (expression.element, expression.modifier is operators.desc_op)
+        for expression in order_by
+    ]
+    backwards = False
+    if cursor:
+        direction, values = _decode_cursor(
+            cursor, columns=[column for column, _ in columns]
+        )
+        backwards = direction == "prev"
+        query = query.where(_keyset_filter(columns, values, backwards))
+    query = (
+        query.order_by(None)
+        .order_by(
+            *[
+                column.desc() if descending != backwards else column.asc()
+                for column, descending in columns
+            ]
+        )
+        .add_columns(*[column for column, _ in columns])
+        .limit(per_page + 1)
+    )
+
+    rows = (await db_session.execute(query)).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    next_cursor = None
+    prev_cursor = None
+    if rows:
+        if has_more or backwards:
+            next_cursor = _encode_cursor("next", list(rows[-1][1:]))
+        if cursor and (has_more or not backwards):
+            prev_cursor = _encode_cursor("prev", list(rows[0][1:]))
+
+    return CursorResults[T](
+        results=[row[0] for row in rows],
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
+    )
@@ -0,0 +1,9 @@
+from pathlib import Path
+
+import aiofiles
+
+
+async def iter_file(path: str | Path, chunk_size: int = 1024 * 1024):
+    async with aiofiles.open(path, mode="rb") as f:
+        while chunk := await f.read(chunk_size):
+            yield chunk
@@ -0,0 +1,94 @@
+"""
+Times tagging a large mp3 with a save after every setter, the way AudioTags
+used to write, against staging the same edits and saving them with a single
+AudioTags.commit(). A second, larger cover is then set on each file to show
+whether the follow up edit fits in the reserved padding.
+
+    make benchmark BENCHMARK=audiotags_commit
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import mutagen.id3
+
+from app.services.audiotags import AudioTags
+
+MIB = 1024 * 1024
+# An MPEG-1 layer III frame header followed by silence, enough for the file to
+# look like audio without needing an encoder.
+FRAME = b"\xff\xfb\x90\x00" + bytes(413)
+
+
+def create_file(path: Path, size: int):
+    mutagen.id3.ID3().save(path)
+    frames = FRAME * (MIB // len(FRAME))
+    with open(path, "ab") as f:
+        for _ in range(size // len(frames)):
+            f.write(frames)
+
+
+def tag(audio_tags: AudioTags, artwork: bytes, save_each: bool):
+    edits = [
+        lambda: setattr(audio_tags, "title", "title"),
+        lambda: setattr(audio_tags, "artist", "artist"),
+        lambda: setattr(audio_tags, "album", "album"),
+        lambda: setattr(audio_tags, "grouping", "grouping"),
+        lambda: audio_tags.set_artwork(data=artwork, mime_type="image/png"),
+    ]
+    for edit in edits:
+        edit()
+        if save_each:
+            # What every setter did before edits were staged.
+            audio_tags.tags.save()
+    if not save_each:
+        audio_tags.commit()
+
+
+def timed(label: str, func):
+    start = time.perf_counter()
+    func()
+    print(f"{label:<36} {time.perf_counter() - start:8.3f}s")
+
+
+def main(args: argparse.Namespace):
+    artwork = os.urandom(args.artwork_kb * 1024)
+    new_artwork = os.urandom(args.artwork_kb * 1024 * 5 // 4)
+    directory = Path(tempfile.mkdtemp())
+    try:
+        source = directory.joinpath("source.mp3")
+        create_file(source, size=args.size_mb * MIB)
+        print(
+            f"{args.size_mb} MiB file, {args.artwork_kb} KiB cover, "
+            f"{len(new_artwork) // 1024} KiB replacement cover\n"
+        )
+        for label, save_each in [("save per setter", True), ("commit", False)]:
+            path = directory.joinpath(f"{label}.mp3")
+            shutil.copyfile(source, path)
+            timed(
+                f"{label}: tag",
+                lambda: tag(AudioTags(path), artwork=artwork, save_each=save_each),
+            )
+
+            def _replace_artwork():
+                audio_tags = AudioTags(path)
+                audio_tags.set_artwork(data=new_artwork, mime_type="image/png")
+                if save_each:
+                    audio_tags.tags.save()
+                else:
+                    audio_tags.commit()
+
+            timed(f"{label}: replace cover", _replace_artwork)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=100)
+    parser.add_argument("--artwork-kb", type=int, default=500)
+    main(parser.parse_args())
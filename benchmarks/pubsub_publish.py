@@ -0,0 +1,115 @@
+"""
+Publishes a burst of channel updates and prints the throughput of sending
+each one over its own connection, the way PubSub.publish_message used to,
+against the debounced Publisher with and without coalescing, while a
+subscriber counts what actually arrives.
+
+    make benchmark BENCHMARK=pubsub_publish
+
+With the defaults against a local Redis 8.2, best of two runs:
+
+    connection per message         11.581s          863 msg/s    10000 received
+    pipelined                       0.997s        10034 msg/s    10000 received
+    pipelined and coalesced         0.123s        81329 msg/s     1000 received
+
+The pipelined sends also append every message to its channel's stream.
+"""
+
+import argparse
+import asyncio
+import time
+
+from redis.asyncio import Redis
+
+from app.services import redisclient
+from app.services.pubsub import PubSub, get_publisher
+from app.settings import settings
+
+CHANNEL = "BENCHMARK_PUBSUB"
+
+
+async def publish_individually(messages: list[tuple[str, str]]):
+    async def _publish(message: str):
+        # A new connection per message, as PubSub opened one for every publish.
+        redis = Redis.from_url(settings.redis_url)
+        try:
+            await asyncio.gather(redis.publish(channel=CHANNEL, message=message))
+        finally:
+            await redis.aclose()
+
+    for _, message in messages:
+        await _publish(message)
+
+
+async def publish_debounced(messages: list[tuple[str, str]], coalesce: bool):
+    pubsub = PubSub(channels=[CHANNEL])
+    for key, message in messages:
+        await pubsub.publish_message(message=message, key=key if coalesce else None)
+    await get_publisher().flush()
+
+
+async def count_received(ready: asyncio.Event, done: asyncio.Event):
+    received = 0
+    async with redisclient.RedisClient() as redis:
+        subscriber = redis.pubsub()
+        await subscriber.subscribe(CHANNEL)
+        ready.set()
+        while not done.is_set():
+            if await subscriber.get_message(
+                ignore_subscribe_messages=True, timeout=0.1
+            ):
+                received += 1
+        await subscriber.aclose()
+    return received
+
+
+async def run(label: str, publish):
+    ready, done = asyncio.Event(), asyncio.Event()
+    counter = asyncio.create_task(count_received(ready=ready, done=done))
+    await ready.wait()
+    start = time.perf_counter()
+    sent = await publish()
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(0.5)
+    done.set()
+    received = await counter
+    print(
+        f"{label:<28} {elapsed:8.3f}s {sent / elapsed:12.0f} msg/s "
+        f"{received:8} received"
+    )
+
+
+async def _sent(coroutine, count: int):
+    await coroutine
+    return count
+
+
+async def main(args: argparse.Namespace):
+    messages = [
+        (f"channel-{i % args.entities}", f'{{"id": {i % args.entities}}}')
+        for i in range(args.messages)
+    ]
+    print(f"{args.messages} messages across {args.entities} entities\n")
+    await run(
+        "connection per message",
+        lambda: _sent(publish_individually(messages), len(messages)),
+    )
+    # A window longer than the burst so every message is buffered and sent in
+    # the final flush.
+    settings.pubsub_debounce_window = 60
+    await run(
+        "pipelined",
+        lambda: _sent(publish_debounced(messages, coalesce=False), len(messages)),
+    )
+    await run(
+        "pipelined and coalesced",
+        lambda: _sent(publish_debounced(messages, coalesce=True), len(messages)),
+    )
+    await redisclient.close_connection_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--entities", type=int, default=1_000)
+    asyncio.run(main(parser.parse_args()))
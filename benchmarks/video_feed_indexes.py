@@ -0,0 +1,219 @@
+"""
+Seeds the test database with a synthetic YouTube dataset and prints the
+EXPLAIN ANALYZE plans of the video feed queries without and with the feed
+indexes declared in app/db/models/youtube.py.
+
+    make benchmark BENCHMARK=video_feed_indexes
+
+WARNING: drops and recreates every table in the test database.
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import Select, select, text
+from sqlalchemy.dialects import postgresql
+
+from app.db import (
+    Base,
+    YoutubeChannel,
+    YoutubeSubscription,
+    YoutubeVideo,
+    YoutubeVideoLike,
+    YoutubeVideoQueue,
+    engine,
+)
+from app.settings import ENV, settings
+
+EMAIL = "user-1@benchmark.dripdrop"
+FEED_INDEX_NAMES = {
+    "ix_youtube_subscriptions_email_active",
+    "ix_youtube_subscriptions_channel_id_active",
+    "ix_youtube_videos_channel_id_published_at",
+    "ix_youtube_videos_category_id_published_at",
+    "ix_youtube_video_likes_email_created_at",
+    "ix_youtube_video_queues_email_created_at",
+    "ix_youtube_video_watches_email_created_at",
+}
+FEED_INDEXES = [
+    index
+    for table in Base.metadata.sorted_tables
+    for index in table.indexes
+    if index.name in FEED_INDEX_NAMES
+]
+
+
+def seed_statements(args: argparse.Namespace):
+    return [
+        text(
+            """
+            INSERT INTO users (email, password, admin, verified, created_at)
+            SELECT 'user-' || i || '@benchmark.dripdrop', '', false, true, now()
+            FROM generate_series(1, :users) i
+            """
+        ).bindparams(users=args.users),
+        text(
+            """
+            INSERT INTO youtube_video_categories (id, name, created_at)
+            SELECT i, 'category ' || i, now()
+            FROM generate_series(1, :categories) i
+            """
+        ).bindparams(categories=args.categories),
+        text(
+            """
+            INSERT INTO youtube_channels
+                (id, title, last_videos_updated, created_at)
+            SELECT 'channel-' || i, 'channel ' || i, now(), now()
+            FROM generate_series(1, :channels) i
+            """
+        ).bindparams(channels=args.channels),
+        text(
+            """
+            INSERT INTO youtube_videos
+                (id, title, thumbnail, channel_id, category_id, published_at,
+                created_at)
+            SELECT
+                'video-' || i,
+                md5(i::text),
+                '',
+                'channel-' || (1 + i % :channels),
+                1 + i % :categories,
+                now() - i * interval '1 minute',
+                now()
+            FROM generate_series(1, :videos) i
+            """
+        ).bindparams(
+            videos=args.videos, channels=args.channels, categories=args.categories
+        ),
+        text(
+            """
+            INSERT INTO youtube_subscriptions
+                (channel_id, email, user_submitted, deleted_at, created_at)
+            SELECT
+                'channel-' || (1 + (u * 7919 + s) % :channels),
+                'user-' || u || '@benchmark.dripdrop',
+                false,
+                CASE WHEN s % 10 = 0 THEN now() ELSE NULL END,
+                now()
+            FROM generate_series(1, :users) u, generate_series(1, :subscriptions) s
+            ON CONFLICT DO NOTHING
+            """
+        ).bindparams(
+            users=args.users, subscriptions=args.subscriptions, channels=args.channels
+        ),
+        text(
+            """
+            INSERT INTO youtube_video_likes (email, video_id, created_at)
+            SELECT
+                'user-' || (1 + i % :users) || '@benchmark.dripdrop',
+                'video-' || i,
+                now() - i * interval '1 second'
+            FROM generate_series(1, :videos, 97) i
+            """
+        ).bindparams(users=args.users, videos=args.videos),
+        text(
+            """
+            INSERT INTO youtube_video_queues (email, video_id, created_at)
+            SELECT
+                'user-' || (1 + i % :users) || '@benchmark.dripdrop',
+                'video-' || i,
+                now() - i * interval '1 second'
+            FROM generate_series(1, :videos, 89) i
+            """
+        ).bindparams(users=args.users, videos=args.videos),
+    ]
+
+
+def feed_queries(per_page: int) -> dict[str, Select]:
+    subscribed_channels = (
+        select(YoutubeChannel.id)
+        .join(YoutubeSubscription)
+        .where(
+            YoutubeSubscription.email == EMAIL,
+            YoutubeSubscription.deleted_at.is_(None),
+        )
+    )
+    feed = (
+        select(YoutubeVideo)
+        .where(YoutubeVideo.channel_id.in_(subscribed_channels))
+        .order_by(
+            YoutubeVideo.published_at.desc(),
+            YoutubeVideo.title.desc(),
+            YoutubeVideo.id.desc(),
+        )
+        .limit(per_page)
+    )
+    return {
+        "feed": feed,
+        "feed by category": feed.where(YoutubeVideo.category_id.in_([1, 2])),
+        "liked": (
+            select(YoutubeVideo)
+            .join(YoutubeVideoLike)
+            .where(YoutubeVideoLike.email == EMAIL)
+            .order_by(YoutubeVideoLike.created_at.desc(), YoutubeVideo.title.desc())
+            .limit(per_page)
+        ),
+        "queued": (
+            select(YoutubeVideo)
+            .join(YoutubeVideoQueue)
+            .where(YoutubeVideoQueue.email == EMAIL)
+            .order_by(YoutubeVideoQueue.created_at.asc(), YoutubeVideo.title.desc())
+            .limit(per_page)
+        ),
+    }
+
+
+async def explain_queries(label: str, per_page: int):
+    async with engine.connect() as conn:
+        await conn.execute(text("ANALYZE"))
+        for name, query in feed_queries(per_page=per_page).items():
+            sql = query.compile(
+                dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+            )
+            result = await conn.execute(
+                text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT TEXT) {sql}")
+            )
+            print(f"\n=== {label}: {name} ===")
+            for (line,) in result:
+                print(line)
+
+
+async def main(args: argparse.Namespace):
+    if settings.env != ENV.TESTING:
+        raise SystemExit("Run with ENV=testing, the test database is reset.")
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        for index in FEED_INDEXES:
+            await conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+        start = time.perf_counter()
+        for statement in seed_statements(args):
+            await conn.execute(statement)
+        print(f"Seeded in {time.perf_counter() - start:.1f}s")
+
+    await explain_queries("without indexes", per_page=args.per_page)
+
+    async with engine.begin() as conn:
+        start = time.perf_counter()
+        for index in FEED_INDEXES:
+            await conn.run_sync(index.create)
+        print(f"\nCreated indexes in {time.perf_counter() - start:.1f}s")
+
+    await explain_queries("with indexes", per_page=args.per_page)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--channels", type=int, default=20_000)
+    parser.add_argument("--categories", type=int, default=30)
+    parser.add_argument("--videos", type=int, default=2_000_000)
+    parser.add_argument("--subscriptions", type=int, default=300)
+    parser.add_argument("--per-page", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
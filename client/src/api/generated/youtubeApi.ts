@@ -74,6 +74,7 @@ const injectedRtkApi = api.injectEndpoints({
         params: {
           page: queryArg.page,
           per_page: queryArg.perPage,
+          cursor: queryArg.cursor,
           video_categories: queryArg.videoCategories,
           channel_id: queryArg.channelId,
           liked_only: queryArg.likedOnly,
@@ -197,8 +198,9 @@ export type GetYoutubeVideoCategoriesApiYoutubeVideosCategoriesGetApiArg = void;
 export type GetYoutubeVideosApiYoutubeVideosListGetApiResponse =
   /** status 200 Successful Response */ YoutubeVideosResponse;
 export type GetYoutubeVideosApiYoutubeVideosListGetApiArg = {
-  page: number;
+  page?: number | null;
   perPage: number;
+  cursor?: string | null;
   videoCategories?: number[] | null;
   channelId?: string | null;
   likedOnly?: boolean | null;
@@ -286,7 +288,9 @@ export type YoutubeVideoResponse = {
 };
 export type YoutubeVideosResponse = {
   videos: YoutubeVideoResponse[];
-  totalPages: number;
+  totalPages?: number | null;
+  nextCursor?: string | null;
+  prevCursor?: string | null;
 };
 export type YoutubeVideoDetailResponse = {
   id: string;
@@ -85,7 +85,7 @@ const VideosView: FunctionComponent<VideosViewProps> = ({ channelId }) => {
         </Grid>
         <Center>
           <Pagination
-            total={totalPages}
+            total={totalPages ?? 1}
             value={params.page}
             onChange={(newPage) => setSearchParams({ page: newPage })}
           />
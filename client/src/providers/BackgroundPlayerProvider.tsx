@@ -59,7 +59,7 @@ export const BackgroundPlayerProvider = ({ children }: { children: ReactNode })
     if (videosStatus.currentData && params) {
       return (
         currentVideoIndex + 1 < videosStatus.currentData?.videos.length ||
-        params.page + 1 <= videosStatus.currentData.totalPages
+        (params.page ?? 1) + 1 <= (videosStatus.currentData.totalPages ?? 0)
       );
     }
     return false;
@@ -69,8 +69,8 @@ export const BackgroundPlayerProvider = ({ children }: { children: ReactNode })
     if (canAdvanceQueue && videosStatus.currentData && params) {
       if (currentVideoIndex + 1 < videosStatus.currentData?.videos.length) {
         setCurrentVideoIndex(currentVideoIndex + 1);
-      } else if (params.page <= videosStatus.currentData.totalPages) {
-        setParams({ ...params, page: params.page + 1 });
+      } else if ((params.page ?? 1) <= (videosStatus.currentData.totalPages ?? 0)) {
+        setParams({ ...params, page: (params.page ?? 1) + 1 });
         setCurrentVideoIndex(0);
       }
     }
@@ -78,7 +78,7 @@ export const BackgroundPlayerProvider = ({ children }: { children: ReactNode })
 
   const canRecedeQueue = useMemo(() => {
     if (params) {
-      return currentVideoIndex - 1 > 0 || params.page > 1;
+      return currentVideoIndex - 1 > 0 || (params.page ?? 1) > 1;
     }
     return false;
   }, [currentVideoIndex, params]);
@@ -87,8 +87,8 @@ export const BackgroundPlayerProvider = ({ children }: { children: ReactNode })
     if (canRecedeQueue && videosStatus.currentData && params) {
       if (currentVideoIndex - 1 > 0) {
         setCurrentVideoIndex(currentVideoIndex - 1);
-      } else if (params.page > 1) {
-        setParams({ ...params, page: params.page - 1 });
+      } else if ((params.page ?? 1) > 1) {
+        setParams({ ...params, page: (params.page ?? 1) - 1 });
         setCurrentVideoIndex(params.perPage - 1);
       }
     }
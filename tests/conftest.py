@@ -1,4 +1,5 @@
 from datetime import datetime, timezone
+from pathlib import Path
 
 import httpx
 import pytest
@@ -16,6 +17,7 @@ from app.db import (
     WebDav,
     YoutubeChannel,
     YoutubeSubscription,
+    YoutubeUserFeed,
     YoutubeVideo,
     YoutubeVideoCategory,
     engine,
@@ -24,6 +26,7 @@ from app.db import (
 from app.services import httpclient, s3, tempfiles
 from app.services.pubsub import PubSub
 from app.settings import ENV, settings
+from app.tasks.app import dispose_db_engine
 
 
 @pytest.fixture(scope="function")
@@ -51,12 +54,44 @@ async def init_temp():
     await tempfiles.cleanup_temp_directory()
 
 
+TEST_ASSETS_DIRECTORY = Path(__file__).parent
+TEST_ASSETS = {
+    "assets/07 tun suh.mp3": "audio/mpeg",
+    "assets/Criminal Sinny & Fako.mp3": "audio/mpeg",
+    "assets/dripdrop.png": "image/png",
+    "assets/sample4.mp3": "audio/mpeg",
+}
+
+
+@pytest.fixture(scope="session", autouse=True)
+async def s3_stand_in():
+    """
+    When test_aws_endpoint_url points at a local S3 stand-in (see the moto
+    service in docker-compose.yml), create the bucket and upload the test assets
+    in tests/assets into it, so the suite runs without the shared test bucket.
+    """
+
+    if not settings.test_aws_endpoint_url:
+        return
+    client = await s3.get_client()
+    try:
+        await client.create_bucket(Bucket=settings.aws_s3_bucket)
+    except client.exceptions.BucketAlreadyOwnedByYou:
+        pass
+    for filename, content_type in TEST_ASSETS.items():
+        await s3.upload_file(
+            filename=filename,
+            body=TEST_ASSETS_DIRECTORY.joinpath(filename).read_bytes(),
+            content_type=content_type,
+        )
+
+
 @pytest.fixture(scope="session", autouse=True)
-async def clean_s3():
+async def clean_s3(s3_stand_in):
     yield
     async for filenames in s3.list_filenames(prefix="music/"):
-        for filename in filenames:
-            await s3.delete_file(filename=filename)
+        await s3.delete_files(filenames=filenames)
+    await s3.close_client()
 
 
 @pytest.fixture(scope="function", autouse=True)
@@ -69,6 +104,7 @@ async def db_session():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
     await engine.dispose()
+    await dispose_db_engine()
 
 
 @pytest.fixture(scope="function", autouse=True)
@@ -84,9 +120,7 @@ async def get_pubsub_channel_messages():
     async def _run(channel: str, max_num_messages: int, timeout: int = 60):
         pubsub = PubSub(channels=[channel])
         messages = []
-        async for message in pubsub.listen(
-            ignore_subscribe_messages=True, timeout=timeout
-        ):
+        async for message in pubsub.listen(timeout=timeout):
             if not message:
                 pubsub.stop_listening()
             messages.append(message)
@@ -253,6 +287,10 @@ async def create_youtube_subscription(
             deleted_at=faker.date_time(tzinfo=timezone.utc) if deleted else None,
         )
         db_session.add(subscription)
+        if not deleted:
+            await db_session.execute(
+                YoutubeUserFeed.backfill(email=email, channel_ids=[channel_id])
+            )
         await db_session.commit()
         return subscription
 
@@ -301,6 +339,8 @@ async def create_youtube_video(
             published_at=published_at or faker.date_time(tzinfo=timezone.utc),
         )
         db_session.add(video)
+        await db_session.flush()
+        await db_session.execute(YoutubeUserFeed.fan_out(video_ids=[video.id]))
         await db_session.commit()
         return video
 
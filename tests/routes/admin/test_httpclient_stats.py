@@ -0,0 +1,76 @@
+from unittest.mock import MagicMock
+
+import httpcore
+from fastapi import status
+
+from app.services import httpclient
+from app.settings import settings
+
+URL = "/api/admin/httpclient/stats"
+
+
+async def test_httpclient_stats_when_not_logged_in(client):
+    """
+    Test http client stats endpoint when not logged in. The endpoint
+    should return a 401 status.
+    """
+
+    response = await client.get(URL)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+async def test_httpclient_stats_when_not_logged_in_as_admin(
+    client, create_and_login_user
+):
+    """
+    Test http client stats endpoint when not logged in as admin. The
+    endpoint should return a 403 status.
+    """
+
+    await create_and_login_user()
+
+    response = await client.get(URL)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+async def test_httpclient_stats(client, create_and_login_user):
+    """
+    Test http client stats endpoint when logged in as admin. The endpoint
+    should return a 200 status with the stats of every connection pool.
+    """
+
+    httpclient.get_client()
+    await create_and_login_user(admin=True)
+
+    response = await client.get(URL)
+    assert response.status_code == status.HTTP_200_OK
+    pools = {pool["host"]: pool for pool in response.json()["pools"]}
+    assert pools.keys() == {"*", *settings.http_host_max_connections.keys()}
+    assert pools["*"]["maxConnections"] == settings.http_max_connections
+
+
+async def test_httpclient_stats_with_http2_connection(client, create_and_login_user):
+    """
+    Test http client stats endpoint with an HTTP/2 connection in a pool. The
+    connection should be counted as an HTTP/2 connection.
+    """
+
+    transport = httpclient.get_client()._transport
+    origin = httpcore.Origin(scheme=b"https", host=b"example.com", port=443)
+    connection = httpcore.AsyncHTTPConnection(origin=origin, http2=True)
+    connection._connection = httpcore.AsyncHTTP2Connection(
+        origin=origin, stream=MagicMock()
+    )
+    await create_and_login_user(admin=True)
+
+    # The client is shared, so other tests may have left connections behind.
+    before = {pool.host: pool for pool in httpclient.get_pool_stats()}["*"]
+    transport._pool._connections.append(connection)
+    try:
+        response = await client.get(URL)
+    finally:
+        transport._pool._connections.remove(connection)
+    assert response.status_code == status.HTTP_200_OK
+    pools = {pool["host"]: pool for pool in response.json()["pools"]}
+    assert pools["*"]["connections"] == before.connections + 1
+    assert pools["*"]["http2Connections"] == before.http2_connections + 1
@@ -0,0 +1,50 @@
+from fastapi import status
+
+from app.services import quota
+from app.settings import settings
+
+URL = "/api/admin/youtube/quota"
+
+
+async def test_youtube_quota_when_not_logged_in(client):
+    """
+    Test youtube quota endpoint when not logged in. The endpoint
+    should return a 401 status.
+    """
+
+    response = await client.get(URL)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+async def test_youtube_quota_when_not_logged_in_as_admin(client, create_and_login_user):
+    """
+    Test youtube quota endpoint when not logged in as admin. The
+    endpoint should return a 403 status.
+    """
+
+    await create_and_login_user()
+
+    response = await client.get(URL)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+async def test_youtube_quota(client, create_and_login_user):
+    """
+    Test youtube quota endpoint when logged in as admin. The endpoint
+    should return a 200 status with the units used and remaining today.
+    """
+
+    await quota.record_usage(endpoint="/youtube/v3/videos")
+    await quota.record_usage(endpoint="/youtube/v3/videos")
+    await quota.record_usage(endpoint="/youtube/v3/search")
+    await create_and_login_user(admin=True)
+
+    response = await client.get(URL)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "date": quota.get_quota_date().isoformat(),
+        "limit": settings.google_api_daily_quota,
+        "used": 102,
+        "remaining": settings.google_api_daily_quota - 102,
+        "endpoints": {"/youtube/v3/videos": 2, "/youtube/v3/search": 100},
+    }
@@ -0,0 +1,187 @@
+import json
+
+from fastapi import status
+
+from app.models.music import MusicJobUpdateResponse
+from app.services import pubsub, sse
+from app.services.pubsub import PubSub
+from app.settings import settings
+
+URL = "/api/music/jobs/events"
+SINCE_URL = "/api/music/jobs/events/since"
+
+
+async def publish_job_updates(email: str, job_id: str, statuses: list[str]):
+    publisher = PubSub(
+        channels=[PubSub.Channels.for_user(PubSub.Channels.MUSIC_JOB_UPDATE, email)]
+    )
+    for job_status in statuses:
+        await publisher.publish_message(
+            MusicJobUpdateResponse(id=job_id, status=job_status).model_dump_json()
+        )
+
+
+async def test_job_events_when_not_logged_in(client):
+    """
+    Test listening to music job events when not logged in. The endpoint should
+    return a 401 status.
+    """
+
+    response = await client.get(URL)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+async def test_job_events_replay_from_last_event_id(monkeypatch, faker):
+    """
+    Test resuming music job events from a Last-Event-ID. The stream should
+    first send the events published after that id, with their stream ids.
+    """
+
+    monkeypatch.setattr(settings, "pubsub_debounce_window", 0)
+    email = faker.email()
+    job_id = faker.uuid4()
+    await publish_job_updates(
+        email=email, job_id=job_id, statuses=["STARTED", "COMPLETED", "STARTED"]
+    )
+    channel = PubSub.Channels.for_user(PubSub.Channels.MUSIC_JOB_UPDATE, email)
+    events = await pubsub.read_stream(channel, after=pubsub.STREAM_START)
+    assert len(events) == 3
+
+    stream = sse.event_stream(channel=channel, last_event_id=events[0][0])
+    try:
+        for event_id, data in events[1:]:
+            event = await anext(stream)
+            assert event == f"id: {event_id}\ndata: {data.decode()}\n\n"
+            assert json.loads(data)["id"] == job_id
+    finally:
+        await stream.aclose()
+
+
+async def test_job_events_since_when_not_logged_in(client):
+    """
+    Test getting music job events since a cursor when not logged in. The
+    endpoint should return a 401 status.
+    """
+
+    response = await client.get(SINCE_URL)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+async def test_job_events_since_with_invalid_cursor(client, create_and_login_user):
+    """
+    Test getting music job events since a cursor that isn't a stream id. The
+    endpoint should return a 422 status.
+    """
+
+    await create_and_login_user()
+    response = await client.get(SINCE_URL, params={"cursor": "yesterday"})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+
+async def test_job_events_since_cursor(
+    client, create_and_login_user, monkeypatch, faker
+):
+    """
+    Test getting music job events since a cursor. The endpoint should return
+    only the events after the cursor and the cursor to continue from.
+    """
+
+    monkeypatch.setattr(settings, "pubsub_debounce_window", 0)
+    user = await create_and_login_user()
+    job_id = faker.uuid4()
+    await publish_job_updates(
+        email=user.email, job_id=job_id, statuses=["STARTED", "COMPLETED"]
+    )
+
+    response = await client.get(SINCE_URL)
+    assert response.status_code == status.HTTP_200_OK
+    json_response = response.json()
+    assert [event["update"] for event in json_response["events"]] == [
+        {"id": job_id, "status": "STARTED"},
+        {"id": job_id, "status": "COMPLETED"},
+    ]
+    assert json_response["reset"] is False
+    first_event_id = json_response["events"][0]["id"]
+    last_event_id = json_response["events"][1]["id"]
+    assert json_response["cursor"] == last_event_id
+
+    response = await client.get(SINCE_URL, params={"cursor": first_event_id})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "events": [
+            {"id": last_event_id, "update": {"id": job_id, "status": "COMPLETED"}}
+        ],
+        "cursor": last_event_id,
+        "reset": False,
+    }
+
+
+async def test_job_events_since_consumer_offset(
+    client, create_and_login_user, monkeypatch, faker
+):
+    """
+    Test getting music job events as a consumer without a cursor. Each request
+    should continue from where the consumer's previous one ended.
+    """
+
+    monkeypatch.setattr(settings, "pubsub_debounce_window", 0)
+    user = await create_and_login_user()
+    job_id = faker.uuid4()
+    await publish_job_updates(email=user.email, job_id=job_id, statuses=["STARTED"])
+
+    response = await client.get(SINCE_URL, params={"consumer": "tab"})
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()["events"]) == 1
+
+    await publish_job_updates(email=user.email, job_id=job_id, statuses=["COMPLETED"])
+
+    response = await client.get(SINCE_URL, params={"consumer": "tab"})
+    assert response.status_code == status.HTTP_200_OK
+    json_response = response.json()
+    assert [event["update"] for event in json_response["events"]] == [
+        {"id": job_id, "status": "COMPLETED"}
+    ]
+
+    response = await client.get(SINCE_URL, params={"consumer": "tab"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["events"] == []
+    assert response.json()["cursor"] == json_response["cursor"]
+
+
+async def test_job_events_since_expired_cursor(client, create_and_login_user):
+    """
+    Test getting music job events since a cursor into a stream that no longer
+    exists. The endpoint should tell the client to reset.
+    """
+
+    await create_and_login_user()
+    response = await client.get(SINCE_URL, params={"cursor": "1-0"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"events": [], "cursor": "1-0", "reset": True}
+
+
+async def test_job_events_since_trimmed_cursor(
+    client, create_and_login_user, monkeypatch, faker
+):
+    """
+    Test getting music job events since a cursor that was trimmed from the
+    stream once it grew past its maximum length. The endpoint should tell the
+    client to reset instead of skipping the trimmed events.
+    """
+
+    monkeypatch.setattr(settings, "pubsub_debounce_window", 0)
+    monkeypatch.setattr(settings, "pubsub_stream_max_length", 10)
+    user = await create_and_login_user()
+    job_id = faker.uuid4()
+    await publish_job_updates(email=user.email, job_id=job_id, statuses=["STARTED"])
+    response = await client.get(SINCE_URL)
+    cursor = response.json()["cursor"]
+
+    # Approximate trimming only drops whole stream nodes of 100 entries.
+    await publish_job_updates(
+        email=user.email, job_id=job_id, statuses=["STARTED"] * 300
+    )
+
+    response = await client.get(SINCE_URL, params={"cursor": cursor})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["reset"] is True
@@ -0,0 +1,169 @@
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+from fastapi import status
+from sqlalchemy import select
+
+from app.db import MusicJob
+from app.routes.music.jobs import PENDING_UPLOAD_KEY
+from app.services import s3
+from app.settings import settings
+from app.tasks.music import run_music_job
+
+UPLOAD_URL = "/api/music/jobs/upload"
+CONFIRM_URL = "/api/music/jobs/{job_id}/confirm"
+
+JOB_DETAILS = {
+    "title": "title",
+    "artist": "artist",
+    "album": "album",
+    "grouping": "grouping",
+}
+
+
+async def test_create_job_upload_when_not_logged_in(client):
+    """
+    Test presigning a music job upload when not logged in. The endpoint should
+    return a 401 status.
+    """
+
+    response = await client.post(
+        UPLOAD_URL, json={"filename": "dripdrop.mp3", "content_type": "audio/mpeg"}
+    )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+async def test_create_job_upload_with_invalid_content_type(
+    client, create_and_login_user
+):
+    """
+    Test presigning a music job upload for a file that isn't audio. The
+    endpoint should return a 422 status.
+    """
+
+    await create_and_login_user()
+    response = await client.post(
+        UPLOAD_URL, json={"filename": "dripdrop.png", "content_type": "image/png"}
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+    assert response.json() == {"detail": "File is incorrect format."}
+
+
+async def test_confirm_job_upload_with_non_existent_upload(
+    client, create_and_login_user, faker
+):
+    """
+    Test confirming a music job upload that was never presigned. The endpoint
+    should return a 404 status.
+    """
+
+    await create_and_login_user()
+    response = await client.post(
+        CONFIRM_URL.format(job_id=faker.uuid4()), json=JOB_DETAILS
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json() == {"detail": "Upload not found."}
+
+
+async def test_confirm_job_upload_that_belongs_to_another_user(
+    client, create_and_login_user
+):
+    """
+    Test confirming a music job upload presigned for another user. The
+    endpoint should return a 404 status.
+    """
+
+    await create_and_login_user()
+    response = await client.post(
+        UPLOAD_URL, json={"filename": "dripdrop.mp3", "content_type": "audio/mpeg"}
+    )
+    job_id = response.json()["jobId"]
+
+    await create_and_login_user()
+    response = await client.post(CONFIRM_URL.format(job_id=job_id), json=JOB_DETAILS)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+async def test_confirm_job_upload_before_uploading(client, create_and_login_user):
+    """
+    Test confirming a music job upload before the file reached the bucket.
+    The endpoint should return a 400 status.
+    """
+
+    await create_and_login_user()
+    response = await client.post(
+        UPLOAD_URL, json={"filename": "dripdrop.mp3", "content_type": "audio/mpeg"}
+    )
+    job_id = response.json()["jobId"]
+
+    response = await client.post(CONFIRM_URL.format(job_id=job_id), json=JOB_DETAILS)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == {"detail": "File has not been uploaded."}
+
+
+async def test_confirm_job_upload_concurrently(
+    client, create_and_login_user, monkeypatch, redis
+):
+    """
+    Test confirming a music job upload that a concurrent confirm claims first.
+    The endpoint should return a 409 status instead of inserting the job again.
+    """
+
+    await create_and_login_user()
+    response = await client.post(
+        UPLOAD_URL, json={"filename": "dripdrop.mp3", "content_type": "audio/mpeg"}
+    )
+    job_id = response.json()["jobId"]
+
+    async def head_file(filename: str):
+        # The other confirm claims the upload while this one checks the bucket.
+        await redis.delete(PENDING_UPLOAD_KEY.format(job_id=job_id))
+        return {"ContentLength": 1}
+
+    monkeypatch.setattr(s3, "head_file", head_file)
+
+    response = await client.post(CONFIRM_URL.format(job_id=job_id), json=JOB_DETAILS)
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert response.json() == {"detail": "Upload already confirmed."}
+
+
+@pytest.mark.long
+async def test_upload_job(
+    client, create_and_login_user, db_session, monkeypatch, test_audio
+):
+    """
+    Test uploading a music job file straight to the bucket with the presigned
+    form and confirming it. The job should be created pointing at the
+    uploaded file and queued to run.
+    """
+
+    run_music_job_mock = MagicMock()
+    monkeypatch.setattr(run_music_job, "delay", run_music_job_mock)
+
+    await create_and_login_user()
+    response = await client.post(
+        UPLOAD_URL, json={"filename": "dripdrop.mp3", "content_type": "audio/mpeg"}
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    presigned_upload = response.json()
+    job_id = presigned_upload["jobId"]
+
+    async with httpx.AsyncClient() as http_client:
+        response = await http_client.post(
+            presigned_upload["url"],
+            data=presigned_upload["fields"],
+            files={"file": ("dripdrop.mp3", test_audio, "audio/mpeg")},
+        )
+        assert response.is_success
+
+    response = await client.post(CONFIRM_URL.format(job_id=job_id), json=JOB_DETAILS)
+    assert response.status_code == status.HTTP_201_CREATED
+
+    music_job = await db_session.scalar(select(MusicJob).where(MusicJob.id == job_id))
+    assert music_job is not None
+    assert music_job.original_filename == (
+        f"{settings.aws_s3_music_folder}/{job_id}/old/dripdrop.mp3"
+    )
+    assert music_job.filename_url == s3.resolve_url(music_job.original_filename)
+    run_music_job_mock.assert_called_once_with(music_job_id=job_id)
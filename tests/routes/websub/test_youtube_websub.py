@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, call
+
+from fastapi import status
+
+from app.db import YoutubeChannel
+from app.services import websub
+from app.tasks.youtube import add_channel_video
+
+URL = "/api/websub/youtube"
+
+FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015"
+      xmlns="http://www.w3.org/2005/Atom">
+  <title>YouTube video feed</title>
+  <entry>
+    <id>yt:video:{video_id}</id>
+    <yt:videoId>{video_id}</yt:videoId>
+    <yt:channelId>{channel_id}</yt:channelId>
+    <title>Video title</title>
+    <published>2026-10-18T12:00:00+00:00</published>
+    <updated>2026-10-18T12:00:05+00:00</updated>
+  </entry>
+</feed>
+"""
+
+
+async def test_verify_youtube_subscription_with_non_existent_channel(client, faker):
+    """
+    Test the hub verifying a subscription for a channel that doesn't exist.
+    The endpoint should return a 404 status.
+    """
+
+    channel_id = faker.uuid4()
+    response = await client.get(
+        URL,
+        params={
+            "channel_id": channel_id,
+            "hub.mode": "subscribe",
+            "hub.topic": websub.get_topic_url(channel_id),
+            "hub.challenge": faker.uuid4(),
+            "hub.lease_seconds": 3600,
+        },
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+async def test_verify_youtube_subscription_with_mismatched_topic(
+    client, faker, create_youtube_channel
+):
+    """
+    Test the hub verifying a subscription for a different topic than the
+    channel's. The endpoint should return a 404 status.
+    """
+
+    channel: YoutubeChannel = await create_youtube_channel()
+    response = await client.get(
+        URL,
+        params={
+            "channel_id": channel.id,
+            "hub.mode": "subscribe",
+            "hub.topic": websub.get_topic_url(faker.uuid4()),
+            "hub.challenge": faker.uuid4(),
+            "hub.lease_seconds": 3600,
+        },
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+async def test_verify_youtube_subscription(
+    client, faker, create_youtube_channel, db_session
+):
+    """
+    Test the hub verifying a subscription. The endpoint should echo the
+    challenge and record when the lease expires.
+    """
+
+    channel: YoutubeChannel = await create_youtube_channel()
+    challenge = faker.uuid4()
+    response = await client.get(
+        URL,
+        params={
+            "channel_id": channel.id,
+            "hub.mode": "subscribe",
+            "hub.topic": websub.get_topic_url(channel.id),
+            "hub.challenge": challenge,
+            "hub.lease_seconds": 3600,
+        },
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.text == challenge
+    await db_session.refresh(channel)
+    assert channel.websub_lease_expires > datetime.now(timezone.utc)
+    assert channel.websub_lease_expires <= datetime.now(timezone.utc) + timedelta(
+        seconds=3600
+    )
+
+
+async def test_receive_youtube_notification_with_invalid_signature(
+    client, faker, monkeypatch, create_youtube_channel
+):
+    """
+    Test receiving a notification with a signature that doesn't match the
+    channel secret. The notification should be acknowledged and ignored.
+    """
+
+    add_channel_video_mock = MagicMock()
+    monkeypatch.setattr(add_channel_video, "delay", add_channel_video_mock)
+
+    channel: YoutubeChannel = await create_youtube_channel()
+    body = FEED.format(video_id=faker.uuid4(), channel_id=channel.id).encode()
+    response = await client.post(
+        URL,
+        params={"channel_id": channel.id},
+        content=body,
+        headers={"X-Hub-Signature": websub.sign(faker.uuid4(), body)},
+    )
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    add_channel_video_mock.assert_not_called()
+
+
+async def test_receive_youtube_notification(
+    client, faker, monkeypatch, create_youtube_channel
+):
+    """
+    Test receiving a signed notification. A single video ingest should be
+    queued for every entry in the feed.
+    """
+
+    add_channel_video_mock = MagicMock()
+    monkeypatch.setattr(add_channel_video, "delay", add_channel_video_mock)
+
+    channel: YoutubeChannel = await create_youtube_channel()
+    video_id = faker.uuid4()
+    body = FEED.format(video_id=video_id, channel_id=channel.id).encode()
+    response = await client.post(
+        URL,
+        params={"channel_id": channel.id},
+        content=body,
+        headers={"X-Hub-Signature": websub.sign(channel.id, body)},
+    )
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    add_channel_video_mock.assert_has_calls(
+        [call(channel_id=channel.id, video_id=video_id)]
+    )
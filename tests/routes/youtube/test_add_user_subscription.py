@@ -69,7 +69,7 @@ async def test_add_user_subscription_with_existing_subscription(
         "title": channel.title,
         "thumbnail": channel.thumbnail,
         "subscribed": True,
-        "updating": channel.updating,
+        "updating": False,
     }
 
 
@@ -114,7 +114,7 @@ async def test_add_user_subscription_with_existing_deleted_subscription(
             "title": channel.title,
             "thumbnail": channel.thumbnail,
             "subscribed": True,
-            "updating": channel.updating,
+            "updating": False,
         }
     subscription = await db_session.scalar(
         select(YoutubeSubscription).where(
@@ -166,7 +166,7 @@ async def test_add_user_subscription_with_existing_channel(
             "title": channel.title,
             "thumbnail": channel.thumbnail,
             "subscribed": True,
-            "updating": channel.updating,
+            "updating": False,
         }
 
     subscription = await db_session.scalar(
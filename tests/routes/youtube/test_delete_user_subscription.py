@@ -1,7 +1,8 @@
 import pytest
 from fastapi import HTTPException, status
+from sqlalchemy import select
 
-from app.db import User, YoutubeSubscription
+from app.db import User, YoutubeSubscription, YoutubeUserFeed, YoutubeVideo
 from app.routes.youtube.subscriptions import delete_user_subscription
 
 URL = "/api/youtube/subscriptions/user"
@@ -63,3 +64,28 @@ async def test_deleting_user_subscription(
 
     await db_session.refresh(subscription)
     assert subscription.deleted_at is not None
+
+
+async def test_deleting_user_subscription_prunes_feed(
+    client,
+    create_youtube_subscription,
+    create_youtube_video,
+    create_and_login_user,
+    db_session,
+):
+    """
+    Test deleting a user subscription removes the channel's videos from the
+    user's feed.
+    """
+
+    user: User = await create_and_login_user()
+    subscription: YoutubeSubscription = await create_youtube_subscription(
+        email=user.email
+    )
+    video: YoutubeVideo = await create_youtube_video(channel_id=subscription.channel_id)
+    query = select(YoutubeUserFeed.video_id).where(YoutubeUserFeed.email == user.email)
+    assert (await db_session.scalars(query)).all() == [video.id]
+
+    response = await client.delete(URL, params={"channel_id": subscription.channel_id})
+    assert response.status_code == status.HTTP_200_OK
+    assert (await db_session.scalars(query)).all() == []
@@ -1,3 +1,7 @@
+import base64
+import json
+from datetime import timezone
+
 from fastapi import status
 
 from app.db import (
@@ -75,6 +79,8 @@ async def test_get_videos_from_specific_channel(
             )
         ],
         "totalPages": 1,
+        "nextCursor": None,
+        "prevCursor": None,
     }
 
 
@@ -131,9 +137,39 @@ async def test_get_videos_from_subscribed_channels(
             )
         ],
         "totalPages": 1,
+        "nextCursor": None,
+        "prevCursor": None,
     }
 
 
+async def test_get_videos_from_subscribed_channels_published_together(
+    client,
+    create_and_login_user,
+    create_youtube_channel,
+    create_youtube_subscription,
+    create_youtube_video,
+    faker,
+):
+    """
+    Test getting youtube videos from a users' subscribed channels when several
+    were published at the same time. They should be ordered by title, as they
+    were before the feed was materialized.
+    """
+
+    user: User = await create_and_login_user()
+    channel: YoutubeChannel = await create_youtube_channel()
+    await create_youtube_subscription(channel_id=channel.id, email=user.email)
+    published_at = faker.date_time(tzinfo=timezone.utc)
+    for title in ["b", "c", "a"]:
+        await create_youtube_video(
+            channel_id=channel.id, title=title, published_at=published_at
+        )
+
+    response = await client.get(URL, params={"page": 1, "per_page": 50})
+    assert response.status_code == status.HTTP_200_OK
+    assert [video["title"] for video in response.json()["videos"]] == ["c", "b", "a"]
+
+
 async def test_get_videos_with_specific_categories(
     client,
     create_and_login_user,
@@ -188,6 +224,8 @@ async def test_get_videos_with_specific_categories(
             )
         ],
         "totalPages": 1,
+        "nextCursor": None,
+        "prevCursor": None,
     }
 
 
@@ -249,6 +287,8 @@ async def test_get_videos_with_queued_only(
             for video, queue in sorted(queued_videos, key=lambda v: v[1].created_at)
         ],
         "totalPages": 1,
+        "nextCursor": None,
+        "prevCursor": None,
     }
 
 
@@ -312,6 +352,8 @@ async def test_get_videos_with_liked_only(
             )
         ],
         "totalPages": 1,
+        "nextCursor": None,
+        "prevCursor": None,
     }
 
 
@@ -370,4 +412,91 @@ async def test_get_videos_with_watches(
             )
         ],
         "totalPages": 1,
+        "nextCursor": None,
+        "prevCursor": None,
     }
+
+
+async def test_get_videos_with_cursor(
+    client,
+    create_and_login_user,
+    create_youtube_channel,
+    create_youtube_subscription,
+    create_youtube_video,
+):
+    """
+    Test paging through youtube videos with cursors. The endpoint should
+    return every video once in order, without a total page count, and the
+    previous cursor should return the preceding page.
+    """
+
+    user: User = await create_and_login_user()
+    channel: YoutubeChannel = await create_youtube_channel()
+    await create_youtube_subscription(channel_id=channel.id, email=user.email)
+
+    videos: list[YoutubeVideo] = [
+        await create_youtube_video(channel_id=channel.id) for _ in range(25)
+    ]
+    expected_ids = [
+        video.id
+        for video in sorted(videos, key=lambda v: (v.published_at, v.id), reverse=True)
+    ]
+
+    pages: list[dict] = []
+    params = {"per_page": 10}
+    while True:
+        response = await client.get(URL, params=params)
+        assert response.status_code == status.HTTP_200_OK
+        json = response.json()
+        assert json["totalPages"] is None
+        pages.append(json)
+        if not json["nextCursor"]:
+            break
+        params = {"per_page": 10, "cursor": json["nextCursor"]}
+
+    assert [len(page["videos"]) for page in pages] == [10, 10, 5]
+    assert [video["id"] for page in pages for video in page["videos"]] == expected_ids
+    assert pages[0]["prevCursor"] is None
+
+    response = await client.get(
+        URL, params={"per_page": 10, "cursor": pages[-1]["prevCursor"]}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert [video["id"] for video in response.json()["videos"]] == [
+        video["id"] for video in pages[1]["videos"]
+    ]
+
+
+async def test_get_videos_with_invalid_cursor(client, create_and_login_user):
+    """
+    Test getting youtube videos with an invalid cursor. The endpoint should
+    return a 400 status.
+    """
+
+    await create_and_login_user()
+
+    response = await client.get(URL, params={"per_page": 10, "cursor": "invalid"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == {"detail": "Invalid cursor."}
+
+
+async def test_get_videos_with_mistyped_cursor(client, create_and_login_user):
+    """
+    Test getting youtube videos with a well formed cursor whose values don't
+    match the columns it resumes from. The endpoint should return a 400 status
+    instead of passing the values on to the database.
+    """
+
+    await create_and_login_user()
+
+    for values in [
+        ["not a date", "title", "video"],
+        [{"datetime": "2024-01-01T00:00:00"}, "title", "video"],
+        [{"datetime": "2024-01-01T00:00:00+00:00"}, "title", 1],
+    ]:
+        cursor = base64.urlsafe_b64encode(
+            json.dumps({"direction": "next", "values": values}).encode()
+        ).decode()
+        response = await client.get(URL, params={"per_page": 10, "cursor": cursor})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json() == {"detail": "Invalid cursor."}
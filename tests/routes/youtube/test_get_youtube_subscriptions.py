@@ -52,7 +52,7 @@ async def test_get_user_subscriptions(
                     "title": channel.title,
                     "thumbnail": channel.thumbnail,
                     "subscribed": True,
-                    "updating": channel.updating,
+                    "updating": False,
                 }
                 for channel in channels
             ],
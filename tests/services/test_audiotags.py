@@ -0,0 +1,83 @@
+import os
+import shutil
+from pathlib import Path
+
+import mutagen.id3
+import pytest
+
+from app.services.audiotags import TAG_PADDING, AudioTags
+
+TEST_ASSETS_DIRECTORY = Path(__file__).parent.parent.joinpath("assets")
+TEST_AUDIO = TEST_ASSETS_DIRECTORY.joinpath("sample4.mp3")
+TEST_IMAGE = TEST_ASSETS_DIRECTORY.joinpath("dripdrop.png").read_bytes()
+
+
+@pytest.fixture(scope="function")
+def audio_file(tmp_path):
+    path = tmp_path.joinpath("test.mp3")
+    shutil.copyfile(TEST_AUDIO, path)
+    mutagen.id3.ID3().save(path)
+    return path
+
+
+def test_audio_tags_commit(audio_file):
+    """
+    Test staging several tags and committing them once. The tags should only
+    be written on commit, and the tag should be saved with TAG_PADDING
+    reserved after it once it outgrew its original padding.
+    """
+
+    audio_tags = AudioTags(audio_file)
+    audio_tags.title = "title"
+    audio_tags.artist = "artist"
+    audio_tags.album = "album"
+    audio_tags.grouping = "grouping"
+    audio_tags.set_artwork(data=TEST_IMAGE, mime_type="image/png")
+    assert AudioTags(audio_file).title is None
+
+    audio_tags.commit()
+    assert audio_tags.changed is False
+
+    audio_tags = AudioTags(audio_file)
+    assert audio_tags.title == "title"
+    assert audio_tags.artist == "artist"
+    assert audio_tags.album == "album"
+    assert audio_tags.grouping == "grouping"
+    assert audio_tags.artwork.mime == "image/png"
+    assert audio_tags.artwork.data == TEST_IMAGE
+    assert audio_tags.tags._padding == TAG_PADDING
+
+
+def test_audio_tags_commit_within_padding(audio_file):
+    """
+    Test committing an edit that still fits in the padding reserved by an
+    earlier commit. The tag should be rewritten in place without changing the
+    file size.
+    """
+
+    audio_tags = AudioTags(audio_file)
+    audio_tags.title = "title"
+    audio_tags.set_artwork(data=TEST_IMAGE, mime_type="image/png")
+    audio_tags.commit()
+    file_size = os.path.getsize(audio_file)
+
+    audio_tags = AudioTags(audio_file)
+    audio_tags.title = "a longer title"
+    audio_tags.set_artwork(data=TEST_IMAGE * 2, mime_type="image/png")
+    audio_tags.commit()
+
+    assert os.path.getsize(audio_file) == file_size
+    audio_tags = AudioTags(audio_file)
+    assert audio_tags.title == "a longer title"
+    assert audio_tags.artwork.data == TEST_IMAGE * 2
+
+
+def test_audio_tags_commit_without_changes(audio_file):
+    """
+    Test committing without staging any change. The file should not be
+    written.
+    """
+
+    modified = os.path.getmtime(audio_file)
+    AudioTags(audio_file).commit()
+    assert os.path.getmtime(audio_file) == modified
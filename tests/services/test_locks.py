@@ -0,0 +1,20 @@
+from app.services import locks
+
+
+async def test_semaphore_extend(faker, redis):
+    """
+    Test extending a held semaphore slot. Its expiry should move forward, and
+    a slot that was already released should not be extended.
+    """
+
+    semaphore = locks.Semaphore(name=faker.word(), limit=1, timeout=60)
+    assert await semaphore.acquire()
+    expires = await redis.zscore(semaphore.name, semaphore.token)
+
+    semaphore.timeout = 120
+    assert await semaphore.extend()
+    assert await redis.zscore(semaphore.name, semaphore.token) > expires + 30
+
+    await semaphore.release()
+    assert not await semaphore.extend()
+    assert await redis.zscore(semaphore.name, semaphore.token) is None
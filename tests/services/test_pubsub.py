@@ -0,0 +1,48 @@
+import asyncio
+
+from app.services import pubsub
+from app.services.pubsub import Publisher, PubSub
+from app.settings import settings
+from app.tasks.app import _run_and_flush
+
+
+async def test_flush_publisher_when_send_fails(caplog, faker, monkeypatch):
+    """
+    Test flushing the publisher after a task when sending the buffered messages
+    fails. The task's result should be returned and the failure logged.
+    """
+
+    async def _send(self, messages):
+        raise ConnectionError("send failed")
+
+    monkeypatch.setattr(Publisher, "_send", _send)
+    monkeypatch.setattr(pubsub, "_publisher", None)
+    monkeypatch.setattr(settings, "pubsub_debounce_window", 60)
+
+    async def _task():
+        await PubSub(channels=[faker.word()]).publish_message("message")
+        return "result"
+
+    assert await _run_and_flush(_task()) == "result"
+    assert "send failed" in caplog.text
+
+
+async def test_debounced_flush_when_send_fails(caplog, faker, monkeypatch):
+    """
+    Test the debounce timer flushing the buffered messages when sending them
+    fails. The failure should be logged instead of lost with the timer's task.
+    """
+
+    async def _send(self, messages):
+        raise ConnectionError("send failed")
+
+    monkeypatch.setattr(Publisher, "_send", _send)
+    monkeypatch.setattr(pubsub, "_publisher", None)
+    monkeypatch.setattr(settings, "pubsub_debounce_window", 0.01)
+
+    await PubSub(channels=[faker.word()]).publish_message("message")
+    flusher = pubsub.get_publisher()._flusher
+    await asyncio.wait_for(flusher, timeout=1)
+
+    assert flusher.exception() is None
+    assert "send failed" in caplog.text
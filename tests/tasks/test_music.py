@@ -1,18 +1,30 @@
 import json
 
+import httpx
 import pytest
 import yt_dlp.utils
 from fastapi import UploadFile
 from sqlalchemy.exc import NoResultFound
 
 from app.db import MusicJob, User, WebDav
-from app.services import audiotags
+from app.services import audiotags, ffmpeg, s3
 from app.services.httpclient import AsyncClient
 from app.services.pubsub import PubSub
 from app.settings import settings
+from app.tasks.app import TRANSCODE_QUEUE
 from app.tasks.music import run_music_job
 
 
+def test_run_music_job_routes_to_transcode_queue():
+    """
+    Test routing a music job. It should be sent to the transcode queue so it
+    runs on the CPU bound workers.
+    """
+
+    options = run_music_job.app.amqp.router.route({}, run_music_job.name)
+    assert options["queue"].name == TRANSCODE_QUEUE
+
+
 async def test_run_music_job_with_non_existent_job(faker):
     """
     Test running a music job with a non-existent job ID. The task should
@@ -38,6 +50,27 @@ async def test_run_music_job_with_non_existent_file(create_user, create_music_jo
         await run_music_job(music_job_id=str(music_job.id))
 
 
+async def test_run_music_job_with_missing_uploaded_file(
+    create_user, create_music_job, test_audio
+):
+    """
+    Test running a music job whose uploaded file is no longer in the bucket.
+    The task should raise the download error instead of converting the error
+    response.
+    """
+
+    test_file = UploadFile(
+        filename="test.mp3", file=test_audio, headers={"content-type": "audio/mpeg"}
+    )
+
+    user: User = await create_user()
+    music_job: MusicJob = await create_music_job(email=user.email, file=test_file)
+    await s3.delete_file(filename=music_job.original_filename)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await run_music_job(music_job_id=str(music_job.id))
+
+
 @pytest.mark.long
 @pytest.mark.xfail(raises=yt_dlp.utils.DownloadError)
 async def test_run_music_job_messages(
@@ -59,7 +92,8 @@ async def test_run_music_job_messages(
     task = run_music_job(music_job_id=str(music_job.id))
 
     pubsub_messages = await get_pubsub_channel_messages(
-        PubSub.Channels.MUSIC_JOB_UPDATE, max_num_messages=2
+        PubSub.Channels.for_user(PubSub.Channels.MUSIC_JOB_UPDATE, email=user.email),
+        max_num_messages=2,
     )
 
     await task
@@ -122,6 +156,51 @@ async def test_run_music_job_with_audio_url(
         assert tags.grouping == expected_grouping
 
 
+@pytest.mark.long
+async def test_transcode_to_mp3_stream(test_audio, test_image, tmp_path):
+    """
+    Test transcoding a streamed source with metadata and artwork. The output
+    should carry the tags and the artwork as the front cover, and leave out
+    the Xing header ffmpeg can't fill in on a pipe.
+    """
+
+    artwork_file = tmp_path.joinpath("artwork.png")
+    artwork_file.write_bytes(test_image)
+    metadata = {
+        "title": "title",
+        "artist": "artist",
+        "album": "album",
+        "grouping": "grouping",
+    }
+
+    async def _source():
+        for i in range(0, len(test_audio), 4096):
+            yield test_audio[i : i + 4096]
+
+    output = b"".join(
+        [
+            chunk
+            async for chunk in ffmpeg.transcode_to_mp3(
+                source=_source(), metadata=metadata, artwork_file=artwork_file
+            )
+        ]
+    )
+
+    tags = await audiotags.AudioTags.read_tags(file=output, filename="test.mp3")
+    assert tags.title == "title"
+    assert tags.artist == "artist"
+    assert tags.album == "album"
+    assert tags.grouping == "grouping"
+    assert tags.artwork_url == audiotags.AudioTags.get_image_as_base64(
+        test_image, "image/png"
+    )
+    # The Xing header would sit in the first frame after the ID3 tag.
+    tag_size = 10 + sum(byte << (7 * (3 - i)) for i, byte in enumerate(output[6:10]))
+    first_frame = output[tag_size : tag_size + 200]
+    assert b"Xing" not in first_frame
+    assert b"Info" not in first_frame
+
+
 @pytest.mark.long
 async def test_run_music_job_with_file(
     create_user,
@@ -1,6 +1,10 @@
+from unittest.mock import MagicMock
+
 import pytest
 from pydantic import BaseModel
 
+from app.tasks import youtube
+
 
 @pytest.fixture
 def provide_google_api_response():
@@ -12,3 +16,15 @@ def provide_google_api_response():
         return lambda *args, **kwargs: _run()
 
     return _setup
+
+
+@pytest.fixture
+def mock_dispatched_group(monkeypatch):
+    dispatched = []
+
+    def _group(signatures):
+        dispatched.extend(signatures)
+        return MagicMock()
+
+    monkeypatch.setattr(youtube, "group", _group)
+    return dispatched
@@ -0,0 +1,44 @@
+from datetime import timezone
+
+from app.db import YoutubeChannel, YoutubeVideo, YoutubeVideoCategory
+from app.services import google
+from app.tasks.youtube import add_channel_video
+
+
+async def test_add_channel_video(
+    monkeypatch,
+    faker,
+    create_youtube_channel,
+    create_youtube_video_category,
+    db_session,
+):
+    """
+    Test add channel video task. It should only look up the pushed video and
+    store it for the channel.
+    """
+
+    channel: YoutubeChannel = await create_youtube_channel()
+    category: YoutubeVideoCategory = await create_youtube_video_category()
+    api_video = {
+        "id": faker.uuid4(),
+        "title": faker.sentence(),
+        "thumbnail": faker.image_url(),
+        "description": faker.sentence(),
+        "category_id": category.id,
+        "published": faker.past_datetime(tzinfo=timezone.utc).isoformat(),
+    }
+    requested_video_ids = []
+
+    async def get_videos_info(video_ids: list[str]):
+        requested_video_ids.append(video_ids)
+        return [google.YoutubeVideoInfo.model_validate(api_video)]
+
+    monkeypatch.setattr(google, "get_videos_info", get_videos_info)
+
+    await add_channel_video(channel_id=channel.id, video_id=api_video["id"])
+
+    assert requested_video_ids == [[api_video["id"]]]
+    video = await db_session.get(YoutubeVideo, api_video["id"])
+    assert video is not None
+    assert video.channel_id == channel.id
+    assert video.title == api_video["title"]
@@ -1,17 +1,25 @@
 import json
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
+from unittest.mock import MagicMock
 
 import pytest
+from celery.exceptions import Retry
 from sqlalchemy import select
 
 from app.db import (
+    User,
     YoutubeChannel,
     YoutubeVideo,
     YoutubeVideoCategory,
 )
-from app.services import google
+from app.services import google, locks
 from app.services.pubsub import PubSub
-from app.tasks.youtube import add_channel_videos
+from app.settings import settings
+from app.tasks.youtube import (
+    CHANNEL_UPDATES_SEMAPHORE,
+    add_channel_videos,
+    get_updating_channel_ids,
+)
 
 
 async def test_add_channel_videos_with_non_existent_channel(faker):
@@ -96,15 +104,21 @@ async def test_add_channel_videos_with_date_after(
 
 async def test_add_channel_videos_messages(
     monkeypatch,
+    create_user,
     create_youtube_channel,
+    create_youtube_subscription,
     get_pubsub_channel_messages,
     provide_google_api_response,
 ):
     """
-    Test add channel videos task outputs the correct pubsub messages.
+    Test add channel videos task outputs the correct pubsub messages to the
+    users subscribed to the channel.
     """
 
+    monkeypatch.setattr(settings, "pubsub_debounce_window", 0)
+    user: User = await create_user()
     channel: YoutubeChannel = await create_youtube_channel()
+    await create_youtube_subscription(email=user.email, channel_id=channel.id)
 
     monkeypatch.setattr(
         google,
@@ -115,7 +129,10 @@ async def test_add_channel_videos_messages(
     task = add_channel_videos(channel_id=channel.id)
 
     pubsub_messages = await get_pubsub_channel_messages(
-        PubSub.Channels.YOUTUBE_CHANNEL_UPDATE, max_num_messages=2
+        PubSub.Channels.for_user(
+            PubSub.Channels.YOUTUBE_CHANNEL_UPDATE, email=user.email
+        ),
+        max_num_messages=2,
     )
 
     await task
@@ -131,6 +148,50 @@ async def test_add_channel_videos_messages(
     }
 
 
+async def test_add_channel_videos_coalesced_messages(
+    monkeypatch,
+    create_user,
+    create_youtube_channel,
+    create_youtube_subscription,
+    get_pubsub_channel_messages,
+    provide_google_api_response,
+):
+    """
+    Test add channel videos task finishing within the debounce window. Only
+    the final state of the channel should be published.
+    """
+
+    monkeypatch.setattr(settings, "pubsub_debounce_window", 1)
+    user: User = await create_user()
+    channel: YoutubeChannel = await create_youtube_channel()
+    await create_youtube_subscription(email=user.email, channel_id=channel.id)
+
+    monkeypatch.setattr(
+        google,
+        "get_channel_latest_videos",
+        provide_google_api_response(pages=[[]], model=google.YoutubeVideoInfo),
+    )
+
+    task = add_channel_videos(channel_id=channel.id)
+
+    pubsub_messages = await get_pubsub_channel_messages(
+        PubSub.Channels.for_user(
+            PubSub.Channels.YOUTUBE_CHANNEL_UPDATE, email=user.email
+        ),
+        max_num_messages=2,
+        timeout=3,
+    )
+
+    await task
+
+    assert len(pubsub_messages) == 2
+    assert json.loads(pubsub_messages[0]["data"]) == {
+        "id": str(channel.id),
+        "updating": False,
+    }
+    assert pubsub_messages[1] is None
+
+
 async def test_add_channel_videos_with_update(
     monkeypatch,
     faker,
@@ -202,3 +263,177 @@ async def test_add_channel_videos_with_update(
         }
         for video in videos
     ]
+
+
+async def test_add_channel_videos_with_duplicate_videos(
+    monkeypatch,
+    faker,
+    create_youtube_channel,
+    create_youtube_video_category,
+    provide_google_api_response,
+    db_session,
+):
+    """
+    Test add channel videos with the same video repeated across a page. It should
+    store the video once with the last values returned for it.
+    """
+
+    channel: YoutubeChannel = await create_youtube_channel()
+    category: YoutubeVideoCategory = await create_youtube_video_category()
+
+    video_id = faker.uuid4()
+    published = faker.past_datetime(tzinfo=timezone.utc).isoformat()
+    api_videos = [
+        {
+            "id": video_id,
+            "title": faker.sentence(),
+            "thumbnail": faker.image_url(),
+            "description": faker.sentence(),
+            "category_id": category.id,
+            "published": published,
+        }
+        for _ in range(2)
+    ]
+
+    monkeypatch.setattr(
+        google,
+        "get_channel_latest_videos",
+        provide_google_api_response(pages=[api_videos], model=google.YoutubeVideoInfo),
+    )
+    await add_channel_videos(channel_id=channel.id)
+
+    videos = (await db_session.scalars(select(YoutubeVideo))).all()
+    assert [
+        {
+            "id": video.id,
+            "title": video.title,
+            "thumbnail": video.thumbnail,
+            "description": video.description,
+            "category_id": video.category_id,
+            "published": video.published_at.isoformat(),
+        }
+        for video in videos
+    ] == [api_videos[-1]]
+
+
+async def test_add_channel_videos_incremental(
+    monkeypatch,
+    faker,
+    create_youtube_channel,
+    create_youtube_video,
+    create_youtube_video_category,
+    db_session,
+):
+    """
+    Test add channel videos in incremental mode. It should cache the uploads
+    playlist id, only fetch snippets for unseen videos and stop paging once a
+    whole page is already stored.
+    """
+
+    channel: YoutubeChannel = await create_youtube_channel()
+    category: YoutubeVideoCategory = await create_youtube_video_category()
+    known_videos: list[YoutubeVideo] = [
+        await create_youtube_video(channel_id=channel.id, category_id=category.id)
+        for _ in range(2)
+    ]
+    new_api_video = {
+        "id": faker.uuid4(),
+        "title": faker.sentence(),
+        "thumbnail": faker.image_url(),
+        "description": faker.sentence(),
+        "category_id": category.id,
+        "published": faker.past_datetime(tzinfo=timezone.utc).isoformat(),
+    }
+    pages = [
+        [new_api_video["id"], known_videos[0].id],
+        [known_videos[1].id],
+        [faker.uuid4()],
+    ]
+    playlist_id = faker.uuid4()
+    requested_video_ids = []
+
+    async def get_channel_upload_playlist_id(channel_id: str):
+        return playlist_id
+
+    async def get_playlist_video_ids(playlist_id: str):
+        for page in pages:
+            yield page
+
+    async def get_videos_info(video_ids: list[str]):
+        requested_video_ids.append(video_ids)
+        return [google.YoutubeVideoInfo.model_validate(new_api_video)]
+
+    monkeypatch.setattr(
+        google, "get_channel_upload_playlist_id", get_channel_upload_playlist_id
+    )
+    monkeypatch.setattr(google, "get_playlist_video_ids", get_playlist_video_ids)
+    monkeypatch.setattr(google, "get_videos_info", get_videos_info)
+
+    await add_channel_videos(channel_id=channel.id, incremental=True)
+
+    assert requested_video_ids == [[new_api_video["id"]]]
+    await db_session.refresh(channel)
+    assert channel.uploads_playlist_id == playlist_id
+    video = await db_session.get(YoutubeVideo, new_api_video["id"])
+    assert video is not None
+    assert video.channel_id == channel.id
+
+
+async def test_add_channel_videos_when_at_concurrency_limit(
+    create_youtube_channel,
+):
+    """
+    Test add channel videos task when the maximum number of channel updates
+    are already running. The task should be retried without touching the
+    channel.
+    """
+
+    channel: YoutubeChannel = await create_youtube_channel()
+    for _ in range(settings.youtube_channel_update_concurrency):
+        semaphore = locks.Semaphore(
+            name=CHANNEL_UPDATES_SEMAPHORE,
+            limit=settings.youtube_channel_update_concurrency,
+            timeout=settings.timeout,
+        )
+        assert await semaphore.acquire()
+
+    with pytest.raises(Retry):
+        await add_channel_videos(channel_id=channel.id)
+
+    assert await get_updating_channel_ids([channel.id]) == set()
+
+
+async def test_add_channel_videos_while_updating(
+    faker,
+    monkeypatch,
+    create_youtube_channel,
+):
+    """
+    Test add channel videos task requested again while the channel is already
+    updating. The duplicate requests should not scan the channel themselves
+    but be merged into a single follow up run, and the channel should only
+    report as updating while the run is in progress.
+    """
+
+    channel: YoutubeChannel = await create_youtube_channel()
+    earlier_date = faker.date_between(start_date="-30d", end_date="-20d")
+    later_date = faker.date_between(start_date="-10d", end_date="-1d")
+    updating_during_run = []
+
+    async def get_channel_latest_videos(channel_id: str):
+        updating_during_run.append(await get_updating_channel_ids([channel.id]))
+        await add_channel_videos(channel_id=channel.id, date_after=later_date)
+        await add_channel_videos(channel_id=channel.id, date_after=earlier_date)
+        yield []
+
+    monkeypatch.setattr(google, "get_channel_latest_videos", get_channel_latest_videos)
+    add_channel_videos_mock = MagicMock()
+    monkeypatch.setattr(add_channel_videos, "delay", add_channel_videos_mock)
+
+    await add_channel_videos(channel_id=channel.id, date_after=date.today())
+
+    assert updating_during_run == [{channel.id}]
+    assert await get_updating_channel_ids([channel.id]) == set()
+    add_channel_videos_mock.assert_called_once_with(
+        channel_id=channel.id, date_after=earlier_date, incremental=False
+    )
@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from app.db import User, YoutubeChannel
+from app.services import websub
+from app.settings import settings
+from app.tasks.youtube import renew_websub_subscriptions
+
+
+async def test_renew_websub_subscriptions(
+    client,
+    create_user,
+    create_youtube_channel,
+    create_youtube_subscription,
+    db_session,
+    faker,
+    monkeypatch,
+):
+    """
+    Test renew websub subscriptions task against a local stand-in hub that
+    verifies each request against the callback. Subscribed channels without
+    a lease, or with one about to expire, should be subscribed. Channels
+    without subscribers should be unsubscribed.
+    """
+
+    monkeypatch.setattr(
+        settings, "websub_callback_url", "http://testserver/api/websub/youtube"
+    )
+    hub_requests = []
+
+    async def hub_subscribe(channel_id: str, mode: str = "subscribe"):
+        hub_requests.append((channel_id, mode))
+        challenge = faker.uuid4()
+        # Merged into the callback's own query string, which params would replace.
+        url = httpx.URL(websub.get_callback_url(channel_id)).copy_merge_params(
+            {
+                "hub.mode": mode,
+                "hub.topic": websub.get_topic_url(channel_id),
+                "hub.challenge": challenge,
+                "hub.lease_seconds": settings.websub_lease_seconds,
+            }
+        )
+        response = await client.get(url)
+        assert response.text == challenge
+
+    monkeypatch.setattr(websub, "subscribe", hub_subscribe)
+
+    user: User = await create_user()
+    new_channel: YoutubeChannel = await create_youtube_channel()
+    expiring_channel: YoutubeChannel = await create_youtube_channel()
+    leased_channel: YoutubeChannel = await create_youtube_channel()
+    unsubscribed_channel: YoutubeChannel = await create_youtube_channel()
+    for channel in [new_channel, expiring_channel, leased_channel]:
+        await create_youtube_subscription(channel_id=channel.id, email=user.email)
+    expiring_channel.websub_lease_expires = datetime.now(timezone.utc) + timedelta(
+        hours=1
+    )
+    leased_channel.websub_lease_expires = datetime.now(timezone.utc) + timedelta(days=3)
+    unsubscribed_channel.websub_lease_expires = datetime.now(timezone.utc) + timedelta(
+        days=3
+    )
+    await db_session.commit()
+
+    await renew_websub_subscriptions()
+
+    assert sorted(hub_requests) == sorted(
+        [
+            (new_channel.id, "subscribe"),
+            (expiring_channel.id, "subscribe"),
+            (unsubscribed_channel.id, "unsubscribe"),
+        ]
+    )
+    for channel in [new_channel, expiring_channel, unsubscribed_channel]:
+        await db_session.refresh(channel)
+    assert new_channel.websub_lease_expires > datetime.now(timezone.utc) + timedelta(
+        days=4
+    )
+    assert expiring_channel.websub_lease_expires > datetime.now(
+        timezone.utc
+    ) + timedelta(days=4)
+    assert unsubscribed_channel.websub_lease_expires is None
+
+
+async def test_renew_websub_subscriptions_when_a_request_fails(
+    create_user,
+    create_youtube_channel,
+    create_youtube_subscription,
+    monkeypatch,
+):
+    """
+    Test renew websub subscriptions task when the hub rejects one channel's
+    request. The remaining channels should still be subscribed.
+    """
+
+    monkeypatch.setattr(
+        settings, "websub_callback_url", "http://testserver/api/websub/youtube"
+    )
+    user: User = await create_user()
+    channels: list[YoutubeChannel] = [await create_youtube_channel() for _ in range(3)]
+    for channel in channels:
+        await create_youtube_subscription(channel_id=channel.id, email=user.email)
+    failing_channel_id = channels[0].id
+    hub_requests = []
+
+    async def hub_subscribe(channel_id: str, mode: str = "subscribe"):
+        hub_requests.append(channel_id)
+        if channel_id == failing_channel_id:
+            raise httpx.HTTPStatusError(
+                "Service Unavailable",
+                request=httpx.Request("POST", settings.websub_hub_url),
+                response=httpx.Response(503),
+            )
+
+    monkeypatch.setattr(websub, "subscribe", hub_subscribe)
+
+    await renew_websub_subscriptions()
+
+    assert sorted(hub_requests) == sorted(channel.id for channel in channels)
@@ -1,12 +1,17 @@
 from datetime import timezone
-from unittest.mock import MagicMock, call
 
 from app.db import User, YoutubeChannel
-from app.tasks.youtube import add_channel_videos, update_channel_videos
+from app.services import quota
+from app.settings import settings
+from app.tasks.youtube import CHANNEL_UPDATE_SLOT_SECONDS, update_channel_videos
 
 
 async def test_update_channel_videos(
-    create_user, monkeypatch, create_youtube_channel, create_youtube_subscription, faker
+    create_user,
+    mock_dispatched_group,
+    create_youtube_channel,
+    create_youtube_subscription,
+    faker,
 ):
     """
     Test update channel videos task. All channels belonging to
@@ -18,9 +23,6 @@ async def test_update_channel_videos(
         start_date="-2d", end_date="-1d", tzinfo=timezone.utc
     )
 
-    add_channel_videos_mock = MagicMock()
-    monkeypatch.setattr(add_channel_videos, "delay", add_channel_videos_mock)
-
     user: User = await create_user()
     channels: list[YoutubeChannel] = [
         await create_youtube_channel(last_videos_updated=yesterday_date)
@@ -29,30 +31,38 @@ async def test_update_channel_videos(
     for channel in channels:
         await create_youtube_subscription(channel_id=channel.id, email=user.email)
     await update_channel_videos()
-    add_channel_videos_mock.assert_has_calls(
+    assert sorted(
+        [signature.kwargs for signature in mock_dispatched_group],
+        key=lambda kwargs: kwargs["channel_id"],
+    ) == sorted(
         [
-            call(channel_id=channel.id, date_after=yesterday_date.date())
+            {
+                "channel_id": channel.id,
+                "date_after": yesterday_date.date(),
+                "incremental": True,
+            }
             for channel in channels
         ],
-        any_order=True,
+        key=lambda kwargs: kwargs["channel_id"],
     )
 
 
 async def test_update_channel_videos_with_deleted_subscriptions(
-    create_user, monkeypatch, create_youtube_channel, create_youtube_subscription, faker
+    create_user,
+    mock_dispatched_group,
+    create_youtube_channel,
+    create_youtube_subscription,
+    faker,
 ):
     """
-    Test update channel videos task with deleted subscriptions. All channels belonging to
-    an active subscription should be updated within the last day.
+    Test update channel videos task with deleted subscriptions. All channels
+    belonging to an active subscription should be updated within the last day.
     """
 
     yesterday_date = faker.date_time_between(
         start_date="-2d", end_date="-1d", tzinfo=timezone.utc
     )
 
-    add_channel_videos_mock = MagicMock()
-    monkeypatch.setattr(add_channel_videos, "delay", add_channel_videos_mock)
-
     user: User = await create_user()
     channels: list[YoutubeChannel] = [
         await create_youtube_channel(last_videos_updated=yesterday_date)
@@ -63,44 +73,63 @@ async def test_update_channel_videos_with_deleted_subscriptions(
             channel_id=channel.id, email=user.email, deleted=i > 4
         )
     await update_channel_videos()
-    add_channel_videos_mock.assert_has_calls(
+    assert sorted(
+        [signature.kwargs for signature in mock_dispatched_group],
+        key=lambda kwargs: kwargs["channel_id"],
+    ) == sorted(
         [
-            call(channel_id=channel.id, date_after=yesterday_date.date())
+            {
+                "channel_id": channel.id,
+                "date_after": yesterday_date.date(),
+                "incremental": True,
+            }
             for channel in channels[:5]
         ],
-        any_order=True,
+        key=lambda kwargs: kwargs["channel_id"],
     )
 
 
 async def test_update_channel_videos_with_specified_date_after(
-    create_user, monkeypatch, create_youtube_channel, create_youtube_subscription, faker
+    create_user,
+    mock_dispatched_group,
+    create_youtube_channel,
+    create_youtube_subscription,
+    faker,
 ):
     """
-    Test update channel videos task with a specified date after. All channels belonging to
-    an active subscription should be updated with the date after given.
+    Test update channel videos task with a specified date after. All channels
+    belonging to an active subscription should be updated with the date after given.
     """
 
     date_after = faker.date_time(tzinfo=timezone.utc)
 
-    add_channel_videos_mock = MagicMock()
-    monkeypatch.setattr(add_channel_videos, "delay", add_channel_videos_mock)
-
     user: User = await create_user()
     channels: list[YoutubeChannel] = [await create_youtube_channel() for _ in range(10)]
     for channel in channels:
         await create_youtube_subscription(channel_id=channel.id, email=user.email)
     await update_channel_videos(date_after=date_after.date())
-    add_channel_videos_mock.assert_has_calls(
+    assert sorted(
+        [signature.kwargs for signature in mock_dispatched_group],
+        key=lambda kwargs: kwargs["channel_id"],
+    ) == sorted(
         [
-            call(channel_id=channel.id, date_after=date_after.date())
+            {
+                "channel_id": channel.id,
+                "date_after": date_after.date(),
+                "incremental": True,
+            }
             for channel in channels
         ],
-        any_order=True,
+        key=lambda kwargs: kwargs["channel_id"],
     )
 
 
 async def test_update_channel_videos_with_min_last_updated(
-    create_user, monkeypatch, create_youtube_channel, create_youtube_subscription, faker
+    create_user,
+    mock_dispatched_group,
+    create_youtube_channel,
+    create_youtube_subscription,
+    faker,
 ):
     """
     Test update channel videos task with a no specified date after it should
@@ -112,15 +141,133 @@ async def test_update_channel_videos_with_min_last_updated(
         start_date="-60d", end_date="-30d", tzinfo=timezone.utc
     )
 
-    add_channel_videos_mock = MagicMock()
-    monkeypatch.setattr(add_channel_videos, "delay", add_channel_videos_mock)
-
     user: User = await create_user()
     channel: YoutubeChannel = await create_youtube_channel(
         last_videos_updated=month_ago
     )
     await create_youtube_subscription(channel_id=channel.id, email=user.email)
     await update_channel_videos()
-    add_channel_videos_mock.assert_has_calls(
-        [call(channel_id=channel.id, date_after=month_ago.date())]
+    assert [signature.kwargs for signature in mock_dispatched_group] == [
+        {
+            "channel_id": channel.id,
+            "date_after": month_ago.date(),
+            "incremental": True,
+        }
+    ]
+
+
+async def test_update_channel_videos_within_quota_budget(
+    create_user,
+    monkeypatch,
+    mock_dispatched_group,
+    create_youtube_channel,
+    create_youtube_subscription,
+    create_youtube_video,
+    faker,
+):
+    """
+    Test update channel videos task when the quota budget only covers one
+    channel. The channel most likely to have new uploads should be updated.
+    """
+
+    yesterday_date = faker.date_time_between(
+        start_date="-2d", end_date="-1d", tzinfo=timezone.utc
     )
+
+    async def get_sweep_budget(sweep_interval):
+        return 3
+
+    monkeypatch.setattr(quota, "get_sweep_budget", get_sweep_budget)
+
+    user: User = await create_user()
+    quiet_channel: YoutubeChannel = await create_youtube_channel(
+        last_videos_updated=yesterday_date
+    )
+    active_channel: YoutubeChannel = await create_youtube_channel(
+        last_videos_updated=yesterday_date
+    )
+    for channel in [quiet_channel, active_channel]:
+        await create_youtube_subscription(channel_id=channel.id, email=user.email)
+    for _ in range(5):
+        await create_youtube_video(
+            channel_id=active_channel.id,
+            published_at=faker.date_time_between(
+                start_date="-10d", end_date="-2d", tzinfo=timezone.utc
+            ),
+        )
+    await update_channel_videos()
+    assert [signature.kwargs for signature in mock_dispatched_group] == [
+        {
+            "channel_id": active_channel.id,
+            "date_after": yesterday_date.date(),
+            "incremental": True,
+        }
+    ]
+
+
+async def test_update_channel_videos_with_per_channel_date_after(
+    create_user,
+    mock_dispatched_group,
+    create_youtube_channel,
+    create_youtube_subscription,
+    faker,
+):
+    """
+    Test update channel videos task with channels last updated at different
+    times. Each channel should get its own date after rather than the first
+    channel's.
+    """
+
+    yesterday_date = faker.date_time_between(
+        start_date="-2d", end_date="-1d", tzinfo=timezone.utc
+    )
+    month_ago = faker.date_time_between(
+        start_date="-60d", end_date="-30d", tzinfo=timezone.utc
+    )
+
+    user: User = await create_user()
+    recent_channel: YoutubeChannel = await create_youtube_channel(
+        last_videos_updated=yesterday_date
+    )
+    stale_channel: YoutubeChannel = await create_youtube_channel(
+        last_videos_updated=month_ago
+    )
+    for channel in [recent_channel, stale_channel]:
+        await create_youtube_subscription(channel_id=channel.id, email=user.email)
+    await update_channel_videos()
+    assert {
+        signature.kwargs["channel_id"]: signature.kwargs["date_after"]
+        for signature in mock_dispatched_group
+    } == {
+        recent_channel.id: yesterday_date.date(),
+        stale_channel.id: month_ago.date(),
+    }
+
+
+async def test_update_channel_videos_staggered(
+    create_user,
+    monkeypatch,
+    mock_dispatched_group,
+    create_youtube_channel,
+    create_youtube_subscription,
+):
+    """
+    Test update channel videos task with more channels than can be updated at
+    once. Each batch of channels should be delayed until the previous one is
+    expected to have freed its slots.
+    """
+
+    monkeypatch.setattr(settings, "youtube_channel_update_concurrency", 2)
+
+    user: User = await create_user()
+    for _ in range(5):
+        channel: YoutubeChannel = await create_youtube_channel()
+        await create_youtube_subscription(channel_id=channel.id, email=user.email)
+    await update_channel_videos()
+    assert [signature.options["countdown"] for signature in mock_dispatched_group] == [
+        0,
+        0,
+        CHANNEL_UPDATE_SLOT_SECONDS,
+        CHANNEL_UPDATE_SLOT_SECONDS,
+        2 * CHANNEL_UPDATE_SLOT_SECONDS,
+    ]
@@ -0,0 +1,123 @@
+from unittest.mock import MagicMock
+
+from sqlalchemy import select
+
+from app.db import User, YoutubeChannel, YoutubeSubscription, YoutubeUserChannel
+from app.services import google
+from app.tasks.youtube import add_channel_videos, update_user_subscriptions
+
+
+async def test_update_user_subscriptions_without_user_channel(monkeypatch, create_user):
+    """
+    Test update user subscriptions for a user without a youtube channel. It should
+    not request the user's subscriptions.
+    """
+
+    get_channel_subscriptions_mock = MagicMock()
+    monkeypatch.setattr(
+        google, "get_channel_subscriptions", get_channel_subscriptions_mock
+    )
+
+    user: User = await create_user()
+    await update_user_subscriptions(email=user.email)
+    get_channel_subscriptions_mock.assert_not_called()
+
+
+async def test_update_user_subscriptions(
+    monkeypatch,
+    faker,
+    db_session,
+    create_user,
+    create_youtube_channel,
+    create_youtube_subscription,
+    provide_google_api_response,
+):
+    """
+    Test update user subscriptions. It should create new channels and
+    subscriptions, reactivate deleted subscriptions, keep user submitted
+    subscriptions and soft delete subscriptions no longer returned by youtube.
+    """
+
+    add_channel_videos_mock = MagicMock()
+    monkeypatch.setattr(add_channel_videos, "delay", add_channel_videos_mock)
+
+    user: User = await create_user()
+    db_session.add(YoutubeUserChannel(id=faker.uuid4(), email=user.email))
+    await db_session.commit()
+
+    kept_channel: YoutubeChannel = await create_youtube_channel()
+    await create_youtube_subscription(email=user.email, channel_id=kept_channel.id)
+    deleted_channel: YoutubeChannel = await create_youtube_channel()
+    await create_youtube_subscription(
+        email=user.email, channel_id=deleted_channel.id, deleted=True
+    )
+    removed_channel: YoutubeChannel = await create_youtube_channel()
+    await create_youtube_subscription(email=user.email, channel_id=removed_channel.id)
+    user_submitted_channel: YoutubeChannel = await create_youtube_channel()
+    db_session.add(
+        YoutubeSubscription(
+            email=user.email,
+            channel_id=user_submitted_channel.id,
+            user_submitted=True,
+        )
+    )
+    await db_session.commit()
+
+    new_channel = {
+        "id": faker.uuid4(),
+        "title": faker.word(),
+        "thumbnail": faker.image_url(),
+    }
+    updated_kept_channel = {
+        "id": kept_channel.id,
+        "title": faker.word(),
+        "thumbnail": faker.image_url(),
+    }
+    monkeypatch.setattr(
+        google,
+        "get_channel_subscriptions",
+        provide_google_api_response(
+            pages=[
+                [updated_kept_channel, new_channel],
+                [
+                    {
+                        "id": deleted_channel.id,
+                        "title": deleted_channel.title,
+                        "thumbnail": deleted_channel.thumbnail,
+                    }
+                ],
+            ],
+            model=google.YoutubeChannelInfo,
+        ),
+    )
+
+    await update_user_subscriptions(email=user.email)
+
+    # The task ran in its own session, so the subscriptions already loaded in
+    # this one are stale.
+    subscriptions = {
+        subscription.channel_id: subscription
+        for subscription in await db_session.scalars(
+            select(YoutubeSubscription)
+            .where(YoutubeSubscription.email == user.email)
+            .execution_options(populate_existing=True)
+        )
+    }
+    assert subscriptions.keys() == {
+        kept_channel.id,
+        deleted_channel.id,
+        removed_channel.id,
+        user_submitted_channel.id,
+        new_channel["id"],
+    }
+    assert subscriptions[kept_channel.id].deleted_at is None
+    assert subscriptions[deleted_channel.id].deleted_at is None
+    assert subscriptions[new_channel["id"]].deleted_at is None
+    assert subscriptions[user_submitted_channel.id].deleted_at is None
+    assert subscriptions[removed_channel.id].deleted_at is not None
+
+    await db_session.refresh(kept_channel)
+    assert kept_channel.title == updated_kept_channel["title"]
+    assert kept_channel.thumbnail == updated_kept_channel["thumbnail"]
+
+    add_channel_videos_mock.assert_called_once_with(channel_id=new_channel["id"])